@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from config import Config
+from app.json_provider import ORJSONProvider
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -10,6 +11,7 @@ migrate = Migrate()
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = ORJSONProvider(app)
 
     # Initialize extensions
     db.init_app(app)
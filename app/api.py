@@ -1,26 +1,83 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from app.sharepoint_client import SharePointClient
-import pandas as pd
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+import csv
+import hashlib
 import io
-import json
+import itertools
+import re
+import tempfile
 from datetime import datetime
 
 api_bp = Blueprint('api', __name__)
 
+# Validation patterns used to reject malformed input before parsing it
+_ISO_DATETIME_RE = re.compile(
+    r'^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:Z|[+-]\d{2}:?\d{2})?$'
+)
+_NUMBER_RE = re.compile(r'^\s*[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*$')
+
+# HTTP caching: field metadata changes rarely, data is revalidated via its ETag
+FIELDS_CACHE_CONTROL = 'private, max-age=300'
+DATA_CACHE_CONTROL = 'private, no-cache'
+
+# Export streaming settings
+EXPORT_PAGE_SIZE = 5000
+EXPORT_CHUNK_ROWS = 500
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024
+EXPORT_READ_SIZE = 64 * 1024
+
+# Supported export formats: (mimetype, file extension)
+EXPORT_FORMATS = {
+    'excel': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
 @api_bp.route('/data', methods=['GET'])
 def get_data():
     """Get paginated data with filtering and sorting"""
     try:
-        page = int(request.args.get('page', 1))
-        page_size = int(request.args.get('pageSize', 100))
-        filters = request.args.get('filters')
-        sort_field = request.args.get('sortField')
-        sort_order = request.args.get('sortOrder', 'asc')
+        page, page_size, filters, sort_field, sort_order = _parse_data_args()
+        client = SharePointClient()
         
-        if filters:
-            filters = json.loads(filters)
+        # Unchanged list + identical query means the client's copy is still current
+        etag = _query_etag(client, page, page_size, filters, sort_field, sort_order)
+        if etag is not None and etag in request.if_none_match:
+            return _cached_response(Response(status=304), etag, DATA_CACHE_CONTROL)
         
+        data = client.get_list_items(
+            page=page,
+            page_size=page_size,
+            filters=filters,
+            sort_field=sort_field,
+            sort_order=sort_order
+        )
+        
+        # Never let a client cache an empty or failed fetch
+        if etag is None or not data['items']:
+            return jsonify(data)
+        return _cached_response(jsonify(data), etag, DATA_CACHE_CONTROL)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/data.ndjson', methods=['GET'])
+def stream_data():
+    """Stream one page of filtered and sorted items as newline-delimited JSON"""
+    try:
+        page, page_size, filters, sort_field, sort_order = _parse_data_args()
         client = SharePointClient()
+        
+        # Same revalidation as /data, with a tag of its own for the other representation
+        etag = _query_etag(client, 'ndjson', page, page_size, filters, sort_field, sort_order)
+        if etag is not None and etag in request.if_none_match:
+            return _cached_response(Response(status=304), etag, DATA_CACHE_CONTROL)
+        
+        # Pages come from the client's page cache and cursor cache, like /data
         data = client.get_list_items(
             page=page,
             page_size=page_size,
@@ -28,22 +85,67 @@ def get_data():
             sort_field=sort_field,
             sort_order=sort_order
         )
+        items = data['items']
+        header = {key: data.get(key) for key in ('fields', 'total', 'page', 'page_size')}
         
-        return jsonify(data)
+        def generate():
+            # Header line first, then one line per item
+            yield orjson.dumps(header) + b'\n'
+            for item in items:
+                yield orjson.dumps(item, default=str) + b'\n'
+        
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        if etag is None or not items:
+            return response
+        return _cached_response(response, etag, DATA_CACHE_CONTROL)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _parse_data_args():
+    """Read (page, page size, filters, sort field, sort order) from the query string"""
+    filters = request.args.get('filters')
+    return (
+        int(request.args.get('page', 1)),
+        int(request.args.get('pageSize', 100)),
+        orjson.loads(filters) if filters else None,
+        request.args.get('sortField'),
+        request.args.get('sortOrder', 'asc')
+    )
+
+def _query_etag(client, *query):
+    """ETag for a query against the list's current contents, or None without a change token"""
+    change_token = client.get_change_token()
+    if not change_token:
+        return None
+    return _etag([*query, change_token])
+
 @api_bp.route('/fields', methods=['GET'])
 def get_fields():
     """Get list field definitions"""
     try:
         client = SharePointClient()
         fields = client.get_list_fields()
-        return jsonify({'fields': fields})
+        
+        response = jsonify({'fields': fields})
+        if not fields:
+            return response
+        
+        response = _cached_response(response, _etag(fields), FIELDS_CACHE_CONTROL)
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _etag(payload):
+    """Compute a short ETag for a JSON-serializable payload"""
+    return hashlib.blake2b(orjson.dumps(payload, default=str), digest_size=8).hexdigest()
+
+def _cached_response(response, etag, cache_control):
+    """Attach the ETag and Cache-Control headers to a response"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
 @api_bp.route('/item', methods=['POST'])
 def create_item():
     """Create a new item"""
@@ -100,66 +202,174 @@ def bulk_operations():
 
 @api_bp.route('/export/<format>', methods=['GET'])
 def export_data(format):
-    """Export data to Excel or CSV"""
+    """Export data to Excel, CSV or Parquet"""
+    format = format.lower()
+    if format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported format'}), 400
+    
     try:
         client = SharePointClient()
-        df = client.export_to_dataframe()
+        fields = client.get_list_fields()
+        columns = ['ID'] + [field['name'] for field in fields]
+        items = client.iter_list_items(page_size=EXPORT_PAGE_SIZE, max_rows=current_app.config['MAX_EXPORT_ROWS'])
         
-        if df.empty:
+        # Peek at the first row so an empty list still gets a proper error response
+        first_item = next(items, None)
+        if first_item is None:
             return jsonify({'error': 'No data to export'}), 400
         
-        # Create file in memory
-        output = io.BytesIO()
-        
-        if format.lower() == 'excel':
-            df.to_excel(output, index=False, engine='openpyxl')
-            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            filename = f'sharepoint_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        elif format.lower() == 'csv':
-            df.to_csv(output, index=False)
-            mimetype = 'text/csv'
-            filename = f'sharepoint_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        else:
-            return jsonify({'error': 'Unsupported format'}), 400
+        rows = (
+            [_export_value(item.get(column)) for column in columns]
+            for item in itertools.chain([first_item], items)
+        )
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        mimetype, extension = EXPORT_FORMATS[format]
+        filename = f'sharepoint_data_{timestamp}.{extension}'
         
-        output.seek(0)
+        if format == 'excel':
+            datetime_columns = {
+                idx for idx, field in enumerate(fields, start=1) if field['type'] == 'DateTime'
+            }
+            generator = _stream_excel(columns, rows, datetime_columns)
+        elif format == 'csv':
+            generator = _stream_csv(columns, rows)
+        else:
+            column_types = ['Counter'] + [field['type'] for field in fields]
+            generator = _stream_parquet(columns, rows, column_types)
         
-        return send_file(
-            output,
+        return Response(
+            stream_with_context(generator),
             mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
         )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _export_value(value):
+    """Convert a list item value into something the export writers accept"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def _parse_export_datetime(value):
+    """Parse a DateTime value formatted by the client, or None if it is not one"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+
+# Arrow column type and cell converter per SharePoint field type; others are strings
+PARQUET_COLUMN_TYPES = {
+    'Counter': (pa.int64(), int),
+    'Integer': (pa.int64(), int),
+    'Number': (pa.float64(), float),
+    'Currency': (pa.float64(), float),
+    'Boolean': (pa.bool_(), bool),
+    'DateTime': (pa.timestamp('s'), _parse_export_datetime)
+}
+
+def _stream_csv(columns, rows):
+    """Yield UTF-8 encoded CSV in chunks of EXPORT_CHUNK_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    yield buffer.getvalue().encode('utf-8')
+
+def _stream_excel(columns, rows, datetime_columns=()):
+    """Write rows to an xlsx workbook in constant memory mode and yield its bytes"""
+    # The xlsx zip container can only be finalized once every row is written,
+    # so spool it to a temporary file and stream that back out
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as output:
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'in_memory': False})
+        worksheet = workbook.add_worksheet()
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        worksheet.write_row(0, 0, columns)
+        
+        for row_idx, row in enumerate(rows, start=1):
+            if not datetime_columns:
+                worksheet.write_row(row_idx, 0, row)
+                continue
+            
+            # Write dates as real Excel datetimes so they sort and filter properly
+            for col_idx, value in enumerate(row):
+                dt = _parse_export_datetime(value) if col_idx in datetime_columns else None
+                if dt is not None:
+                    worksheet.write_datetime(row_idx, col_idx, dt, date_format)
+                else:
+                    worksheet.write(row_idx, col_idx, value)
+        
+        workbook.close()
+        yield from _read_spooled(output)
+
+def _stream_parquet(columns, rows, column_types):
+    """Write rows to a zstd Parquet file, one row group per export page, and yield its bytes"""
+    arrow_types = [PARQUET_COLUMN_TYPES.get(t, (pa.string(), str)) for t in column_types]
+    schema = pa.schema([(name, arrow_type) for name, (arrow_type, _) in zip(columns, arrow_types)])
+    
+    # Like xlsx, the Parquet footer is written last, so spool before streaming
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as output:
+        with pq.ParquetWriter(output, schema, compression='zstd') as writer:
+            while True:
+                chunk = list(itertools.islice(rows, EXPORT_PAGE_SIZE))
+                if not chunk:
+                    break
+                
+                arrays = [
+                    pa.array([_parquet_value(convert, value) for value in values], type=arrow_type)
+                    for values, (arrow_type, convert) in zip(zip(*chunk), arrow_types)
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        
+        yield from _read_spooled(output)
+
+def _parquet_value(convert, value):
+    """Convert a cell for a typed Parquet column, using null for anything unconvertible"""
+    if value is None or value == '':
+        return None
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        return None
+
+def _read_spooled(output):
+    """Yield the contents of a spooled export file in EXPORT_READ_SIZE chunks"""
+    output.seek(0)
+    while True:
+        chunk = output.read(EXPORT_READ_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
 @api_bp.route('/search', methods=['POST'])
 def search_data():
     """Global search across all fields"""
     try:
+        # Scanning the whole list in Python silently truncates large lists,
+        # so searching is only offered as a SharePoint-side query
+        if not current_app.config['SEARCH_PUSHDOWN_ENABLED']:
+            return jsonify({'error': 'Server-side search is disabled'}), 501
+        
         search_term = request.json.get('searchTerm', '')
+        page = int(request.json.get('page', 1))
+        page_size = int(request.json.get('pageSize', current_app.config['ROWS_PER_PAGE']))
         client = SharePointClient()
         
-        # Get all data and perform client-side search
-        # In production, implement server-side search
-        all_data = client.get_list_items(page_size=1000)
+        # Push the search down to SharePoint as a CAML <Contains> query
+        filters = {'contains': search_term} if search_term else None
+        data = client.get_list_items(page=page, page_size=page_size, filters=filters)
         
-        if not search_term:
-            return jsonify(all_data)
-        
-        filtered_items = []
-        for item in all_data['items']:
-            for key, value in item.items():
-                if search_term.lower() in str(value).lower():
-                    filtered_items.append(item)
-                    break
-        
-        return jsonify({
-            'items': filtered_items,
-            'total': len(filtered_items),
-            'fields': all_data['fields']
-        })
+        return jsonify(data)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -170,34 +380,34 @@ def validate_data():
     try:
         data = request.json
         client = SharePointClient()
-        fields = client.get_list_fields()
+        fields_index = client.get_fields_index()
         
         errors = []
         
         # Validate required fields
-        for field in fields:
-            if field['required'] and field['name'] not in data:
-                errors.append(f"{field['title']} is required")
+        for name, title in fields_index['required']:
+            if name not in data:
+                errors.append(f"{title} is required")
+        
+        # Validate field types and formats of the submitted values
+        for name, value in data.items():
+            field = fields_index['by_name'].get(name)
+            if field is None:
+                continue
             
-            # Validate field types and formats
-            if field['name'] in data:
-                value = data[field['name']]
-                
-                if field['type'] == 'DateTime' and value:
-                    try:
-                        datetime.fromisoformat(value.replace('Z', '+00:00'))
-                    except:
-                        errors.append(f"{field['title']} has invalid date format")
-                
-                elif field['type'] == 'Number' and value is not None:
-                    try:
-                        float(value)
-                    except:
-                        errors.append(f"{field['title']} must be a number")
-                
-                elif field['type'] == 'Choice' and value:
-                    if value not in field.get('choices', []):
-                        errors.append(f"{field['title']} has invalid choice: {value}")
+            field_type, _, choices, title = field
+            
+            if field_type == 'DateTime' and value:
+                if not _is_valid_datetime(value):
+                    errors.append(f"{title} has invalid date format")
+            
+            elif field_type == 'Number' and value is not None:
+                if not _is_valid_number(value):
+                    errors.append(f"{title} must be a number")
+            
+            elif field_type == 'Choice' and value:
+                if not isinstance(value, str) or value not in choices:
+                    errors.append(f"{title} has invalid choice: {value}")
         
         return jsonify({
             'valid': len(errors) == 0,
@@ -205,4 +415,22 @@ def validate_data():
         })
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def _is_valid_datetime(value):
+    """Check an ISO 8601 date/datetime string, only parsing values shaped like one"""
+    if not isinstance(value, str) or not _ISO_DATETIME_RE.match(value):
+        return False
+    
+    # The pattern does not check ranges such as month 13, so parse to confirm
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return True
+    except ValueError:
+        return False
+
+def _is_valid_number(value):
+    """Check a numeric value without relying on float() raising"""
+    if isinstance(value, (int, float)):
+        return True
+    return isinstance(value, str) and _NUMBER_RE.match(value) is not None
\ No newline at end of file
@@ -1,7 +1,19 @@
+import copy
 import json
-import pandas as pd
+import threading
+import time
+import requests
+from cachetools import LRUCache, TTLCache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from urllib.parse import quote
+from xml.etree.ElementTree import Element, SubElement, tostring
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from office365.runtime.auth.authentication_context import AuthenticationContext
+from office365.runtime.http.http_method import HttpMethod
+from office365.runtime.odata.v3.batch_request import ODataBatchV3Request
+from office365.runtime.odata.v3.json_light_format import JsonLightFormat
 from office365.sharepoint.client_context import ClientContext
 from office365.sharepoint.lists.list import List
 from office365.sharepoint.listitems.listitem import ListItem
@@ -10,21 +22,157 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Field types searched server-side with CAML <Contains>
+SEARCHABLE_FIELD_TYPES = ('Text', 'Note', 'Choice')
+# SharePoint rejects queries with too many nested clauses
+MAX_CAML_OR_CLAUSES = 500
+# Filter operators accepted from the API, mapped to CAML comparison elements
+CAML_OPERATORS = {
+    'eq': 'Eq',
+    'ne': 'Neq',
+    'lt': 'Lt',
+    'gt': 'Gt',
+    'contains': 'Contains',
+    'beginsWith': 'BeginsWith'
+}
+# Largest row count a single query may touch before SharePoint's list view threshold rejects it
+LIST_VIEW_THRESHOLD = 5000
+# Field types that can be used directly as a CAML <Value Type>
+CAML_VALUE_TYPES = ('Text', 'Note', 'Choice', 'Number', 'Integer', 'Counter', 'Currency',
+                    'DateTime', 'Boolean', 'Lookup', 'User')
+
+# Authenticated contexts and the HTTP session are shared by every client in the
+# worker so requests reuse the auth cookie and pooled TLS connections
+_auth_contexts = {}
+_auth_lock = threading.Lock()
+_http_session = None
+_session_lock = threading.Lock()
+
+# List schemas change rarely, so field definitions are cached per list
+FIELDS_CACHE_TTL = 300
+_fields_cache = TTLCache(maxsize=8, ttl=FIELDS_CACHE_TTL)
+# The list's item entity type (e.g. SP.Data.TasksListItem) and ID, which item
+# writes must carry
+_item_types = TTLCache(maxsize=8, ttl=FIELDS_CACHE_TTL)
+_fields_cache_lock = threading.Lock()
+
+# Recently served pages, keyed on the list change token so edits invalidate them;
+# the token (with the item count read alongside it) is cached briefly to avoid a
+# round trip per page
+CHANGE_TOKEN_CACHE_TTL = 5
+_page_cache = LRUCache(maxsize=64)
+_change_token_cache = TTLCache(maxsize=8, ttl=CHANGE_TOKEN_CACHE_TTL)
+# (site, list, change token, query, page size, page) -> paging token where that
+# page starts, so later pages skip the walk from row one
+_page_cursors = LRUCache(maxsize=1024)
+_page_cache_lock = threading.Lock()
+
+def _get_http_session(pool_size):
+    """Return the shared requests session with a pooled HTTPS adapter"""
+    global _http_session
+    with _session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(total=3, backoff_factor=0.3)
+            )
+            session.mount('https://', adapter)
+            _http_session = session
+        return _http_session
+
+def _use_pooled_session(client_request, session):
+    """Send client_request's HTTP calls through session instead of module-level requests calls
+    
+    office365 executes each request with requests.get/post, which opens a new
+    connection (and TLS handshake) per call; this mirrors its
+    execute_request_direct on the shared, pooled session.
+    """
+    def execute_request_direct(request):
+        client_request.beforeExecute.notify(request)
+        kwargs = {
+            'headers': request.headers,
+            'auth': request.auth,
+            'verify': request.verify,
+            'proxies': request.proxies
+        }
+        
+        if request.method == HttpMethod.Get:
+            response = session.get(request.url, stream=request.stream, **kwargs)
+        elif request.method in (HttpMethod.Post, HttpMethod.Patch) and not (request.is_bytes or request.is_file):
+            response = session.request(request.method, request.url, json=request.data, **kwargs)
+        else:
+            response = session.request(request.method, request.url, data=request.data, **kwargs)
+        
+        response.raise_for_status()
+        return response
+    
+    client_request.execute_request_direct = execute_request_direct
+
+def _get_auth_context(site_url, username, password, ttl):
+    """Return a cached authentication context, acquiring a new token when expired"""
+    key = (site_url, username)
+    with _auth_lock:
+        cached = _auth_contexts.get(key)
+        if cached and time.monotonic() - cached[1] < ttl:
+            return cached[0]
+        
+        auth_ctx = AuthenticationContext(url=site_url)
+        if not auth_ctx.acquire_token_for_user(username=username, password=password):
+            _auth_contexts.pop(key, None)
+            return None
+        
+        _auth_contexts[key] = (auth_ctx, time.monotonic())
+        return auth_ctx
+
+def _title_or_str(value):
+    """Return the display title of a user or lookup value"""
+    if not value:
+        return value
+    return value.get('Title', '') if isinstance(value, dict) else str(value)
+
+def _to_datetime_str(value):
+    """Format an ISO 8601 DateTime value, leaving unparseable values untouched"""
+    if not value:
+        return value
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return dt.strftime('%Y-%m-%d %H:%M:%S')
+    except (AttributeError, ValueError):
+        return value
+
+def _identity(value):
+    """Return the value unchanged"""
+    return value
+
+# Per field type value converters used when processing list items
+_FIELD_CONVERTERS = {
+    'DateTime': _to_datetime_str,
+    'User': _title_or_str,
+    'Lookup': _title_or_str
+}
+
 class SharePointClient:
     def __init__(self):
         self.site_url = current_app.config['SHAREPOINT_URL']
         self.username = current_app.config['SHAREPOINT_USERNAME']
         self.password = current_app.config['SHAREPOINT_PASSWORD']
         self.list_name = current_app.config['SHAREPOINT_LIST_NAME']
+        self.pool_size = current_app.config['SHAREPOINT_POOL_SIZE']
+        self.auth_ttl = current_app.config['SHAREPOINT_AUTH_TTL']
+        self.use_batch = current_app.config['SHAREPOINT_USE_BATCH']
+        self.bulk_workers = current_app.config['SHAREPOINT_BULK_WORKERS']
         self.ctx = None
         self.list_obj = None
         
     def authenticate(self):
-        """Authenticate with SharePoint"""
+        """Authenticate with SharePoint, reusing the worker's cached auth context"""
         try:
-            auth_ctx = AuthenticationContext(url=self.site_url)
-            if auth_ctx.acquire_token_for_user(username=self.username, password=self.password):
+            auth_ctx = _get_auth_context(self.site_url, self.username, self.password, self.auth_ttl)
+            if auth_ctx:
                 self.ctx = ClientContext(self.site_url, auth_ctx)
+                _use_pooled_session(self.ctx.pending_request(), _get_http_session(self.pool_size))
                 return True
             else:
                 logger.error("Authentication failed")
@@ -35,22 +183,97 @@ class SharePointClient:
     
     def get_list(self):
         """Get SharePoint list object"""
+        if self.list_obj is not None:
+            return self.list_obj
+        
         if not self.ctx:
             if not self.authenticate():
                 return None
         
         try:
-            web = self.ctx.web
-            self.list_obj = web.lists.get_by_title(self.list_name)
-            self.ctx.load(self.list_obj)
-            self.ctx.execute_query()
+            # Bind the list by title without loading it; queries against the
+            # binding resolve the list server-side, so no round trip is needed
+            self.list_obj = self.ctx.web.lists.get_by_title(self.list_name)
             return self.list_obj
         except Exception as e:
             logger.error(f"Error getting list: {str(e)}")
             return None
     
+    def get_change_token(self):
+        """Get the list's current change token, or None if it cannot be read"""
+        return self._get_list_state()[0]
+    
+    def get_item_count(self):
+        """Get the list's item count as of its current change token, or None if it cannot be read"""
+        return self._get_list_state()[1]
+    
+    def _get_list_state(self):
+        """Return the list's (change token, item count), read in one round trip and cached briefly"""
+        cache_key = (self.site_url, self.list_name)
+        with _page_cache_lock:
+            state = _change_token_cache.get(cache_key)
+        if state is not None:
+            return state
+        
+        if not self.get_list():
+            return None, None
+        
+        try:
+            self.ctx.load(self.list_obj, ['CurrentChangeToken', 'ItemCount'])
+            self.ctx.execute_query()
+            token = self.list_obj.properties.get('CurrentChangeToken')
+            if isinstance(token, dict):
+                token = token.get('StringValue')
+        except Exception as e:
+            logger.error(f"Error getting change token: {str(e)}")
+            return None, None
+        
+        state = (token, self.list_obj.properties.get('ItemCount'))
+        if token:
+            with _page_cache_lock:
+                _change_token_cache[cache_key] = state
+        return state
+    
+    def _invalidate_change_token(self):
+        """Forget the cached change token so this worker's own writes show up at once"""
+        with _page_cache_lock:
+            _change_token_cache.pop((self.site_url, self.list_name), None)
+    
     def get_list_fields(self):
-        """Get list field definitions"""
+        """Get list field definitions, cached per list for FIELDS_CACHE_TTL seconds"""
+        return self._get_cached_fields()['fields']
+    
+    def get_fields_index(self):
+        """Get field metadata indexed by name for O(1) lookups during validation"""
+        return self._get_cached_fields()['index']
+    
+    def _get_cached_fields(self):
+        """Return the cached field definitions and their index, fetching on a miss"""
+        cache_key = (self.site_url, self.list_name)
+        with _fields_cache_lock:
+            cached = _fields_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        field_info = self._fetch_list_fields()
+        cached = {'fields': field_info, 'index': self._build_fields_index(field_info)}
+        if field_info:
+            with _fields_cache_lock:
+                _fields_cache[cache_key] = cached
+        return cached
+    
+    def _build_fields_index(self, fields):
+        """Index fields by name and collect the required ones"""
+        return {
+            'by_name': {
+                f['name']: (f['type'], f['required'], frozenset(f.get('choices') or ()), f['title'])
+                for f in fields
+            },
+            'required': [(f['name'], f['title']) for f in fields if f['required']]
+        }
+    
+    def _fetch_list_fields(self):
+        """Load list field definitions from SharePoint"""
         if not self.get_list():
             return []
         
@@ -80,45 +303,60 @@ class SharePointClient:
         if not self.get_list():
             return {'items': [], 'total': 0, 'fields': []}
         
+        # Pages and their cursors are cached per list change token, so any list change misses
+        cache_key = cursor_key = None
+        change_token = self.get_change_token()
+        if change_token:
+            query_key = json.dumps(filters, sort_keys=True, default=str)
+            cache_key = (self.site_url, self.list_name, change_token, page, page_size,
+                         query_key, sort_field, sort_order)
+            cursor_key = (self.site_url, self.list_name, change_token, query_key, sort_field, sort_order,
+                          page_size)
+            with _page_cache_lock:
+                cached = _page_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
+            # Get field definitions
+            fields = self.get_list_fields()
+            
+            # Later pages start from the paging token of the previous page's last row
+            paging_info = None
+            if page > 1:
+                paging_info = self._get_page_cursor(page, page_size, filters, sort_field, sort_order, fields,
+                                                    cursor_key)
+                if paging_info is None:
+                    total_items = None if filters else self.get_item_count()
+                    return {'items': [], 'total': total_items or 0, 'fields': fields, 'page': page,
+                            'page_size': page_size}
+            
             # Build CAML query
-            query = self._build_caml_query(filters, sort_field, sort_order, page, page_size)
+            query = self._build_caml_query(filters, sort_field, sort_order, page, page_size,
+                                           paging_info=paging_info, fields=fields)
             
             items = self.list_obj.get_items(query)
             self.ctx.load(items)
             self.ctx.execute_query()
             
-            # Get field definitions
-            fields = self.get_list_fields()
+            # A full page means the next one starts right after its last row
+            items = list(items)
+            if cursor_key is not None and len(items) == page_size:
+                with _page_cache_lock:
+                    _page_cursors[cursor_key + (page + 1,)] = self._paging_token(
+                        items[-1], self._sort_field_name(sort_field, fields)
+                    )
             
             # Process items
-            processed_items = []
-            for item in items:
-                item_data = {'ID': item.properties['Id']}
-                for field in fields:
-                    field_name = field['name']
-                    value = item.properties.get(field_name)
-                    
-                    # Handle different field types
-                    if field['type'] == 'DateTime' and value:
-                        try:
-                            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                            item_data[field_name] = dt.strftime('%Y-%m-%d %H:%M:%S')
-                        except:
-                            item_data[field_name] = value
-                    elif field['type'] == 'User' and value:
-                        item_data[field_name] = value.get('Title', '') if isinstance(value, dict) else str(value)
-                    elif field['type'] == 'Lookup' and value:
-                        item_data[field_name] = value.get('Title', '') if isinstance(value, dict) else str(value)
-                    else:
-                        item_data[field_name] = value
-                
-                processed_items.append(item_data)
-            
-            # Get total count (simplified approach)
-            total_items = len(processed_items)  # In production, use proper count query
-            
-            return {
+            converters = self._field_converters(fields)
+            processed_items = [self._process_item(item, converters) for item in items]
+            
+            # Filtered results have no cheap count, so they report the rows up to this page
+            total_items = None if filters else self.get_item_count()
+            if total_items is None:
+                total_items = (page - 1) * page_size + len(processed_items)
+            
+            data = {
                 'items': processed_items,
                 'total': total_items,
                 'fields': fields,
@@ -126,18 +364,77 @@ class SharePointClient:
                 'page_size': page_size
             }
             
+            if cache_key is not None:
+                with _page_cache_lock:
+                    _page_cache[cache_key] = data
+            return data
+            
         except Exception as e:
             logger.error(f"Error getting items: {str(e)}")
             return {'items': [], 'total': 0, 'fields': []}
     
+    def iter_list_items(self, page_size=5000, max_rows=None, filters=None, sort_field=None, sort_order='asc'):
+        """Yield processed list items page by page using SharePoint paging tokens"""
+        if not self.get_list():
+            return
+        
+        fields = self.get_list_fields()
+        converters = self._field_converters(fields)
+        for items in self._iter_item_pages(page_size, fields, max_rows, filters, sort_field, sort_order):
+            for item in items:
+                yield self._process_item(item, converters)
+    
+    def _iter_item_pages(self, page_size, fields, max_rows=None, filters=None, sort_field=None, sort_order='asc'):
+        """Yield raw list item pages, following SharePoint paging tokens"""
+        sort_field = self._sort_field_name(sort_field, fields)
+        paging_info = None
+        remaining = max_rows
+        
+        while True:
+            row_limit = min(page_size, remaining) if remaining is not None else page_size
+            
+            try:
+                query = self._build_caml_query(filters, sort_field, sort_order, page_size=row_limit,
+                                               paging_info=paging_info, fields=fields)
+                items = self.list_obj.get_items(query)
+                self.ctx.load(items)
+                self.ctx.execute_query()
+            except Exception as e:
+                logger.error(f"Error getting items page: {str(e)}")
+                raise
+            
+            page = list(items)
+            if page:
+                yield page
+            
+            if remaining is not None:
+                remaining -= len(page)
+            if len(page) < row_limit or remaining == 0:
+                return
+            
+            paging_info = self._paging_token(page[-1], sort_field)
+    
+    def _field_converters(self, fields):
+        """Resolve each field's value converter once, before any rows are processed"""
+        return [(f['name'], _FIELD_CONVERTERS.get(f['type'], _identity)) for f in fields]
+    
+    def _process_item(self, item, converters):
+        """Convert a SharePoint list item into a plain dict keyed by field name"""
+        properties = item.properties
+        item_data = {'ID': properties['Id']}
+        item_data.update({name: convert(properties.get(name)) for name, convert in converters})
+        return item_data
+    
     def create_item(self, item_data):
         """Create a new list item"""
         if not self.get_list():
             return None
         
         try:
+            self._ensure_item_type()
             item_create_info = self.list_obj.add_item(item_data)
             self.ctx.execute_query()
+            self._invalidate_change_token()
             return item_create_info.properties['Id']
         except Exception as e:
             logger.error(f"Error creating item: {str(e)}")
@@ -149,9 +446,10 @@ class SharePointClient:
             return False
         
         try:
-            item = self.list_obj.get_item_by_id(item_id)
-            item.update(item_data)
+            self._ensure_item_type()
+            self._bind_item(item_id, item_data).update()
             self.ctx.execute_query()
+            self._invalidate_change_token()
             return True
         except Exception as e:
             logger.error(f"Error updating item: {str(e)}")
@@ -163,54 +461,317 @@ class SharePointClient:
             return False
         
         try:
-            item = self.list_obj.get_item_by_id(item_id)
-            item.delete_object()
+            self._bind_item(item_id).delete_object()
             self.ctx.execute_query()
+            self._invalidate_change_token()
             return True
         except Exception as e:
             logger.error(f"Error deleting item: {str(e)}")
             return False
     
+    def _bind_item(self, item_id, item_data=None):
+        """Bind a list item by ID without loading it, staging any changed values"""
+        # The item is addressed as items(id) directly and not fetched first.
+        # With the entity type cached by _ensure_item_type, an update is a
+        # single MERGE; without it update() first GETs the item's ParentList
+        item = self.list_obj.get_item_by_id(item_id)
+        if item_data is not None:
+            item._entity_type_name = self.list_obj.properties.get('ListItemEntityTypeFullName')
+        for name, value in (item_data or {}).items():
+            item.set_property(name, value)
+        return item
+    
+    def _ensure_item_type(self):
+        """Load the list's item entity type, cached per list, and prime the list binding with it
+        
+        add_item and ListItem.update otherwise queue a GET of the list to learn
+        the type. Inside a $batch that GET runs after the change set, so the
+        writes would go out typed as SP.ListItem.
+        """
+        cache_key = (self.site_url, self.list_name)
+        with _fields_cache_lock:
+            cached = _item_types.get(cache_key)
+        if cached is None:
+            self.ctx.load(self.list_obj, ['ListItemEntityTypeFullName', 'Id'])
+            self.ctx.execute_query()
+            cached = (self.list_obj.properties['ListItemEntityTypeFullName'], self.list_obj.properties['Id'])
+            with _fields_cache_lock:
+                _item_types[cache_key] = cached
+        
+        self.list_obj.set_property('ListItemEntityTypeFullName', cached[0], False)
+        self.list_obj.set_property('Id', cached[1], False)
+        return cached[0]
+    
     def bulk_update(self, updates):
-        """Perform bulk updates"""
+        """Perform bulk updates in a single SharePoint $batch request"""
         if not self.get_list():
             return {'success': False, 'errors': []}
         
+        if not self.use_batch:
+            return self._bulk_update_concurrent(updates)
+        
         results = {'success': True, 'errors': []}
+        queued = []
+        
+        # Creates and updates need the item type before anything is queued;
+        # loading it later would flush the queue or run after the change set
+        if any(update.get('action') in ('create', 'update') for update in updates):
+            try:
+                self._ensure_item_type()
+            except Exception as e:
+                logger.error(f"Error loading list item type: {str(e)}")
+                return {'success': False, 'errors': [self._bulk_error(update, e) for update in updates]}
         
+        # Queue every operation on the context without executing it
         for update in updates:
             try:
-                if update['action'] == 'create':
-                    self.create_item(update['data'])
-                elif update['action'] == 'update':
-                    self.update_item(update['id'], update['data'])
-                elif update['action'] == 'delete':
-                    self.delete_item(update['id'])
+                self._queue_operation(update)
+                queued.append(update)
+            except Exception as e:
+                results['errors'].append(self._bulk_error(update, e))
+                results['success'] = False
+        
+        if queued:
+            try:
+                self._execute_batch()
             except Exception as e:
-                results['errors'].append({
-                    'id': update.get('id'),
-                    'action': update['action'],
-                    'error': str(e)
-                })
+                # The batch response does not say which operation failed
+                logger.error(f"Error executing batch: {str(e)}")
+                results['errors'].extend(self._bulk_error(update, e) for update in queued)
                 results['success'] = False
+            
+            # Part of a failed batch may still have been applied
+            self._invalidate_change_token()
         
         return results
     
-    def export_to_dataframe(self):
-        """Export all list data to pandas DataFrame"""
-        data = self.get_list_items(page_size=current_app.config['MAX_EXPORT_ROWS'])
-        if data['items']:
-            return pd.DataFrame(data['items'])
-        return pd.DataFrame()
+    def _execute_batch(self, items_per_batch=100):
+        """Send the pending queries as $batch requests over the pooled HTTP session
+        
+        Mirrors ClientContext.execute_batch, whose own batch request would go
+        out through module-level requests calls on a fresh connection.
+        """
+        batch_request = ODataBatchV3Request(JsonLightFormat())
+        batch_request.beforeExecute += self.ctx._authenticate_request
+        batch_request.beforeExecute += self.ctx._ensure_form_digest
+        _use_pooled_session(batch_request, _get_http_session(self.pool_size))
+        while self.ctx.has_pending_request:
+            batch_request.execute_query(self.ctx._get_next_query(items_per_batch))
+    
+    def _bulk_update_concurrent(self, updates):
+        """Perform bulk updates as concurrent individual requests"""
+        results = {'success': True, 'errors': []}
+        if not updates:
+            return results
+        
+        # Keep the worker count within the shared HTTP connection pool
+        max_workers = min(self.bulk_workers, self.pool_size, len(updates))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._run_operation, update): update for update in updates}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    results['errors'].append(self._bulk_error(futures[future], e))
+                    results['success'] = False
+        
+        return results
+    
+    def _run_operation(self, update):
+        """Run a single bulk operation on its own client context"""
+        # ClientContext queues are not thread-safe, so each operation gets a
+        # copy of this client that shares only the cached authentication
+        client = copy.copy(self)
+        client.ctx = None
+        client.list_obj = None
+        
+        action = update['action']
+        if action == 'create':
+            success = client.create_item(update['data']) is not None
+        elif action == 'update':
+            success = client.update_item(update['id'], update['data'])
+        elif action == 'delete':
+            success = client.delete_item(update['id'])
+        else:
+            raise ValueError(f"Unsupported action: {action}")
+        
+        if not success:
+            raise RuntimeError(f"Failed to {action} item")
+    
+    def _queue_operation(self, update):
+        """Add a single bulk operation to the pending request"""
+        action = update['action']
+        if action == 'create':
+            self.list_obj.add_item(update['data'])
+        elif action == 'update':
+            self._bind_item(update['id'], update['data']).update()
+        elif action == 'delete':
+            self._bind_item(update['id']).delete_object()
+        else:
+            raise ValueError(f"Unsupported action: {action}")
+    
+    def _bulk_error(self, update, error):
+        """Build the error entry reported for a failed bulk operation"""
+        return {
+            'id': update.get('id'),
+            'action': update.get('action'),
+            'error': str(error)
+        }
+    
+    def _get_page_cursor(self, page, page_size, filters, sort_field, sort_order, fields, cursor_key=None):
+        """Find the paging token for the first row of the given page, or None past the end of the list"""
+        sort_field = self._sort_field_name(sort_field, fields)
+        known, paging_info = 1, None
+        if cursor_key is not None:
+            with _page_cache_lock:
+                # Start from the nearest page whose position is already known
+                known = page
+                while known > 1 and cursor_key + (known,) not in _page_cursors:
+                    known -= 1
+                paging_info = _page_cursors.get(cursor_key + (known,)) if known > 1 else None
+        if known == page:
+            return paging_info
+        
+        # Walk the remaining rows with only the columns the token needs, in
+        # page-aligned hops small enough to stay under the list view threshold
+        hop = max(page_size, LIST_VIEW_THRESHOLD // page_size * page_size)
+        view_fields = ['ID', sort_field] if sort_field and sort_field != 'ID' else ['ID']
+        seen = (known - 1) * page_size
+        skip = (page - 1) * page_size
+        
+        while seen < skip:
+            row_limit = min(hop, skip - seen)
+            query = self._build_caml_query(filters, sort_field, sort_order, page_size=row_limit,
+                                           paging_info=paging_info, fields=fields, view_fields=view_fields)
+            items = self.list_obj.get_items(query)
+            self.ctx.load(items)
+            self.ctx.execute_query()
+            
+            items = list(items)
+            if len(items) < row_limit:
+                return None
+            
+            seen += row_limit
+            paging_info = self._paging_token(items[-1], sort_field)
+            if cursor_key is not None:
+                with _page_cache_lock:
+                    _page_cursors[cursor_key + (seen // page_size + 1,)] = paging_info
+        
+        return paging_info
+    
+    def _paging_token(self, item, sort_field=None):
+        """Build the ListItemCollectionPositionNext token that follows an item"""
+        token = 'Paged=TRUE'
+        if sort_field and sort_field != 'ID':
+            token += f"&p_{sort_field}={quote(str(item.properties.get(sort_field) or ''))}"
+        return token + f"&p_ID={item.properties['Id']}"
     
-    def _build_caml_query(self, filters=None, sort_field=None, sort_order='asc', page=1, page_size=100):
+    def _build_caml_query(self, filters=None, sort_field=None, sort_order='asc', page=1, page_size=100,
+                          paging_info=None, fields=None, view_fields=None):
         """Build CAML query for SharePoint"""
-        # Simplified CAML query - in production, build proper CAML XML
+        fields = fields or []
+        view = Element('View')
+        
+        if view_fields:
+            view_fields_el = SubElement(view, 'ViewFields')
+            for name in view_fields:
+                SubElement(view_fields_el, 'FieldRef', Name=name)
+        
+        query = SubElement(view, 'Query')
+        
+        where = self._build_where(filters, fields)
+        if where is not None:
+            SubElement(query, 'Where').append(where)
+        
+        sort_field = self._sort_field_name(sort_field, fields)
+        if sort_field:
+            order_by = SubElement(query, 'OrderBy')
+            ascending = 'FALSE' if (sort_order or 'asc').lower() == 'desc' else 'TRUE'
+            SubElement(order_by, 'FieldRef', Name=sort_field, Ascending=ascending)
+        
+        if page_size:
+            row_limit = SubElement(view, 'RowLimit', Paged='TRUE')
+            row_limit.text = str(page_size)
+        
         query_options = {
-            'ViewXml': '<View><Query></Query></View>'
+            'ViewXml': tostring(view, encoding='unicode')
         }
         
-        if page_size:
-            query_options['ViewXml'] = f'<View><Query></Query><RowLimit>{page_size}</RowLimit></View>'
+        if paging_info:
+            query_options['ListItemCollectionPosition'] = {'PagingInfo': paging_info}
+        
+        return query_options
+    
+    def _sort_field_name(self, sort_field, fields):
+        """Return the sort field if it names a known column, otherwise None"""
+        if sort_field == 'ID' or any(f['name'] == sort_field for f in fields):
+            return sort_field
+        return None
+    
+    def _build_where(self, filters, fields):
+        """Convert the filters dict into a CAML <Where> body, or None when unfiltered"""
+        if not filters:
+            return None
+        
+        field_types = {f['name']: f['type'] for f in fields}
+        field_types['ID'] = 'Counter'
+        clauses = []
+        
+        for name, condition in filters.items():
+            if name == 'contains':
+                if condition:
+                    search_clause = self._build_search_clause(condition, fields)
+                    if search_clause is not None:
+                        clauses.append(search_clause)
+                continue
+            
+            # Unknown columns would make SharePoint reject the whole query
+            if name not in field_types:
+                continue
+            
+            if isinstance(condition, dict):
+                op = condition.get('op', 'eq')
+                value = condition.get('value')
+            else:
+                op, value = 'eq', condition
+            
+            if op not in CAML_OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            
+            value_type = field_types[name] if field_types[name] in CAML_VALUE_TYPES else 'Text'
+            clauses.append(self._build_comparison(CAML_OPERATORS[op], name, value_type, value))
+        
+        return self._combine_clauses('And', clauses)
+    
+    def _build_search_clause(self, search_term, fields):
+        """Build an Or-chain of <Contains> clauses across the searchable text fields"""
+        field_names = [f['name'] for f in fields if f['type'] in SEARCHABLE_FIELD_TYPES]
+        clauses = [
+            self._build_comparison('Contains', name, 'Text', search_term)
+            for name in field_names[:MAX_CAML_OR_CLAUSES]
+        ]
+        return self._combine_clauses('Or', clauses)
+    
+    def _build_comparison(self, operator, field_name, value_type, value):
+        """Build a single CAML comparison element"""
+        comparison = Element(operator)
+        SubElement(comparison, 'FieldRef', Name=field_name)
+        value_el = SubElement(comparison, 'Value', Type=value_type)
+        if isinstance(value, bool):
+            value_el.text = '1' if value else '0'
+        else:
+            value_el.text = '' if value is None else str(value)
+        return comparison
+    
+    def _combine_clauses(self, operator, clauses):
+        """Join clauses with <And>/<Or>, which take exactly two children, nesting from the right"""
+        if not clauses:
+            return None
         
-        return query_options
\ No newline at end of file
+        combined = clauses[-1]
+        for clause in reversed(clauses[:-1]):
+            parent = Element(operator)
+            parent.append(clause)
+            parent.append(combined)
+            combined = parent
+        return combined
\ No newline at end of file
@@ -7,6 +7,11 @@ class SharePointExcelApp {
         this.pendingChanges = new Map();
         this.isConnected = false;
         this.currentData = [];
+        this.pageSize = 100;
+        this.nextPage = 1;
+        this.hasMore = false;
+        this.totalRows = 0;
+        this.pageLoading = null;
         
         this.initializeGrid();
         this.setupEventListeners();
@@ -34,12 +39,13 @@ class SharePointExcelApp {
             suppressRowClickSelection: false,
             animateRows: true,
             pagination: true,
-            paginationPageSize: 100,
+            paginationPageSize: this.pageSize,
             sideBar: {
                 toolPanels: ['filters', 'columns']
             },
             onCellEditingStopped: (event) => this.onCellChanged(event),
             onSelectionChanged: () => this.updateSelectionCount(),
+            onPaginationChanged: () => this.onPaginationChanged(),
             onGridReady: (params) => {
                 this.gridApi = params.api;
                 this.gridColumnApi = params.columnApi;
@@ -81,6 +87,7 @@ class SharePointExcelApp {
         // Export buttons
         document.getElementById('exportExcel').addEventListener('click', () => this.exportData('excel'));
         document.getElementById('exportCsv').addEventListener('click', () => this.exportData('csv'));
+        document.getElementById('exportParquet').addEventListener('click', () => this.exportData('parquet'));
         
         // Search
         document.getElementById('globalSearch').addEventListener('input', (e) => this.performGlobalSearch(e.target.value));
@@ -109,18 +116,19 @@ class SharePointExcelApp {
             this.fields = fieldsData.fields || [];
             this.setupColumns();
             
-            // Then get data
-            const dataResponse = await fetch('/api/data');
-            const data = await dataResponse.json();
-            
-            if (data.error) {
-                throw new Error(data.error);
+            // Then load the first page; later pages follow as the user pages on.
+            // Let any page still loading finish first so it cannot land in the new data
+            this.hasMore = false;
+            while (this.pageLoading) {
+                await this.pageLoading.catch(() => {});
             }
-            
-            this.currentData = data.items || [];
+            this.currentData = [];
             this.gridApi.setRowData(this.currentData);
+            this.nextPage = 1;
+            this.hasMore = true;
+            await this.loadNextPage();
             
-            this.updateStatusInfo(data.total || 0);
+            this.updateStatusInfo(this.totalRows);
             this.isConnected = true;
             this.showError(null);
             
@@ -133,6 +141,87 @@ class SharePointExcelApp {
         }
     }
 
+    onPaginationChanged() {
+        // Fetch the next server page once the user reaches the last loaded grid page
+        if (!this.gridApi || !this.hasMore || this.pageLoading) return;
+        
+        if (this.gridApi.paginationGetCurrentPage() >= this.gridApi.paginationGetTotalPages() - 1) {
+            this.loadNextPage().catch(error => {
+                console.error('Error loading page:', error);
+                this.showError(error.message);
+            });
+        }
+    }
+
+    loadNextPage() {
+        if (!this.pageLoading) {
+            const url = `/api/data.ndjson?page=${this.nextPage}&pageSize=${this.pageSize}`;
+            this.pageLoading = this.streamData(url)
+                .then(({ header, count }) => {
+                    this.totalRows = header.total ?? this.currentData.length;
+                    this.hasMore = count === this.pageSize;
+                    this.nextPage += 1;
+                    this.updateStatusInfo(this.totalRows);
+                })
+                .finally(() => {
+                    this.pageLoading = null;
+                })
+                // Keep one page loaded ahead of the one being viewed
+                .then(() => this.onPaginationChanged());
+        }
+        return this.pageLoading;
+    }
+
+    async streamData(url) {
+        const response = await fetch(url);
+        
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.error || response.statusText);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let header = null;
+        let count = 0;
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            
+            // Keep any trailing partial line for the next chunk
+            const lines = buffer.split('\n');
+            buffer = done ? '' : lines.pop();
+            
+            const rows = [];
+            for (const line of lines) {
+                if (!line) continue;
+                
+                const row = JSON.parse(line);
+                if (!header) {
+                    // First line carries the field definitions, total and page
+                    header = row;
+                    continue;
+                }
+                if (row.error) {
+                    throw new Error(row.error);
+                }
+                rows.push(row);
+            }
+            
+            if (rows.length) {
+                count += rows.length;
+                this.currentData.push(...rows);
+                this.gridApi.applyTransaction({ add: rows });
+            }
+            
+            if (done) break;
+        }
+        
+        return { header: header || {}, count };
+    }
+
     setupColumns() {
         const columns = [
             {
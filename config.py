@@ -15,7 +15,12 @@ class Config:
     SHAREPOINT_USERNAME = os.environ.get('SHAREPOINT_USERNAME') or ''
     SHAREPOINT_PASSWORD = os.environ.get('SHAREPOINT_PASSWORD') or ''
     SHAREPOINT_LIST_NAME = os.environ.get('SHAREPOINT_LIST_NAME') or 'Your List Name'
+    SHAREPOINT_POOL_SIZE = int(os.environ.get('SHAREPOINT_POOL_SIZE') or 50)
+    SHAREPOINT_AUTH_TTL = int(os.environ.get('SHAREPOINT_AUTH_TTL') or 1800)
+    SHAREPOINT_USE_BATCH = (os.environ.get('SHAREPOINT_USE_BATCH') or 'True').lower() == 'true'
+    SHAREPOINT_BULK_WORKERS = int(os.environ.get('SHAREPOINT_BULK_WORKERS') or 16)
     
     # App Configuration
     ROWS_PER_PAGE = int(os.environ.get('ROWS_PER_PAGE') or 100)
-    MAX_EXPORT_ROWS = int(os.environ.get('MAX_EXPORT_ROWS') or 10000)
\ No newline at end of file
+    MAX_EXPORT_ROWS = int(os.environ.get('MAX_EXPORT_ROWS') or 10000)
+    SEARCH_PUSHDOWN_ENABLED = (os.environ.get('SEARCH_PUSHDOWN_ENABLED') or 'True').lower() == 'true'
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+Gunicorn configuration - gevent workers so SharePoint round trips overlap
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('GUNICORN_WORKERS') or multiprocessing.cpu_count())
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS') or 500)
+timeout = 120
\ No newline at end of file
@@ -1,17 +1,32 @@
 #!/usr/bin/env python3
 """
 SharePoint Excel Interface - Main application entry point
+
+In production run under gunicorn with gevent workers:
+    gunicorn -c gunicorn.conf.py run:app
 """
 import os
+
+# gevent must patch the standard library before sockets or ssl are imported;
+# needed when the app is loaded outside a gevent worker (e.g. gunicorn --preload)
+if os.environ.get('GEVENT_MONKEY_PATCH', 'False').lower() == 'true':
+    from gevent import monkey
+    monkey.patch_all()
+
 from app import create_app
 
 app = create_app()
 
 if __name__ == '__main__':
+    # The Flask server is single-process and only meant for development
+    if not app.debug:
+        raise SystemExit('Set FLASK_DEBUG=True to use the development server, '
+                         'or run: gunicorn -c gunicorn.conf.py run:app')
+    
     # Get port from environment variable or default to 5000
     port = int(os.environ.get('PORT', 5000))
     
-    # Run the application
+    # Run the development server
     app.run(
         debug=True,
         host='0.0.0.0',
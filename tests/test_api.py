@@ -0,0 +1,271 @@
+import io
+import zipfile
+from datetime import datetime
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app import api, create_app, sharepoint_client
+from config import Config
+
+FIELDS = [
+    {'name': 'Title', 'title': 'Title', 'type': 'Text', 'required': True, 'choices': []},
+    {'name': 'Due', 'title': 'Due', 'type': 'DateTime', 'required': False, 'choices': []}
+]
+ITEMS = [
+    {'ID': 1, 'Title': 'a', 'Due': '2024-01-02 03:04:05'},
+    {'ID': 2, 'Title': 'b,c', 'Due': None}
+]
+
+
+class ApiTestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class FakeClient:
+    """Stands in for SharePointClient, serving FIELDS and ITEMS without SharePoint"""
+    def __init__(self):
+        self.fields = FIELDS
+        self.items = ITEMS
+        self.change_token = 'token-1'
+        self.pages_served = 0
+    
+    def get_list_fields(self):
+        return self.fields
+    
+    def get_change_token(self):
+        return self.change_token
+    
+    def get_list_items(self, page=1, page_size=100, filters=None, sort_field=None, sort_order='asc'):
+        self.pages_served += 1
+        self.last_query = (page, page_size, filters)
+        items = self.items[(page - 1) * page_size:page * page_size]
+        return {'items': items, 'total': len(self.items), 'fields': self.fields, 'page': page,
+                'page_size': page_size}
+    
+    def iter_list_items(self, page_size=5000, max_rows=None, filters=None, sort_field=None, sort_order='asc'):
+        return iter(self.items[:max_rows])
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(api, 'SharePointClient', lambda: client)
+    return client
+
+
+@pytest.fixture
+def http(fake_client):
+    return create_app(ApiTestConfig).test_client()
+
+
+@pytest.fixture
+def validating_http():
+    # The real client, with this list's field definitions already cached
+    app = create_app(ApiTestConfig)
+    with app.test_request_context():
+        client = sharepoint_client.SharePointClient()
+        fields = FIELDS + [
+            {'name': 'Status', 'title': 'Status', 'type': 'Choice', 'required': False, 'choices': ['Open', 'Done']},
+            {'name': 'Amount', 'title': 'Amount', 'type': 'Number', 'required': False, 'choices': []}
+        ]
+        sharepoint_client._fields_cache[(client.site_url, client.list_name)] = {
+            'fields': fields, 'index': client._build_fields_index(fields)
+        }
+    yield app.test_client()
+    sharepoint_client._fields_cache.clear()
+
+
+def test_export_csv(http):
+    response = http.get('/api/export/csv')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    assert response.headers['Content-Disposition'].endswith('.csv"')
+    assert response.get_data(as_text=True).splitlines() == [
+        'ID,Title,Due',
+        '1,a,2024-01-02 03:04:05',
+        '2,"b,c",'
+    ]
+
+
+def test_data_etag_revalidates_until_the_list_changes(http, fake_client):
+    response = http.get('/api/data?page=1&pageSize=10')
+    etag = response.headers['ETag']
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert response.get_json()['items'] == ITEMS
+
+    response = http.get('/api/data?page=1&pageSize=10', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert fake_client.pages_served == 1
+
+    # Another query or a new change token gets a fresh page
+    assert http.get('/api/data?page=2&pageSize=10', headers={'If-None-Match': etag}).status_code == 200
+    fake_client.change_token = 'token-2'
+    assert http.get('/api/data?page=1&pageSize=10', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_data_without_change_token_is_not_cached(http, fake_client):
+    fake_client.change_token = None
+
+    response = http.get('/api/data')
+
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+
+
+def test_fields_conditional_response(http):
+    response = http.get('/api/fields')
+    etag = response.headers['ETag']
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, max-age=300'
+    assert response.get_json() == {'fields': FIELDS}
+    assert http.get('/api/fields', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_export_rejects_unknown_format(http):
+    response = http.get('/api/export/pdf')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Unsupported format'}
+
+
+def test_export_empty_list(http, fake_client):
+    fake_client.items = []
+
+    response = http.get('/api/export/csv')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'No data to export'}
+
+
+def test_export_stops_at_max_export_rows(http, fake_client):
+    fake_client.items = [{'ID': i, 'Title': str(i), 'Due': None} for i in range(1, 21)]
+    http.application.config['MAX_EXPORT_ROWS'] = 5
+
+    lines = http.get('/api/export/csv').get_data(as_text=True).splitlines()
+
+    assert lines[0] == 'ID,Title,Due'
+    assert len(lines) == 6
+
+
+def test_export_excel_writes_real_datetimes(http):
+    response = http.get('/api/export/excel')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'].endswith('.xlsx"')
+    sheet = zipfile.ZipFile(io.BytesIO(response.data)).read('xl/worksheets/sheet1.xml').decode()
+    # Constant memory mode writes strings inline; the date is a styled serial number
+    assert '<c r="B2" t="inlineStr"><is><t>a</t></is></c>' in sheet
+    assert '<c r="C2" s="1"><v>45293.12783564815</v></c>' in sheet
+
+
+def test_export_parquet_types_columns(http):
+    response = http.get('/api/export/parquet')
+
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.data))
+    # Parquet has no seconds unit, so the timestamp('s') column reads back as milliseconds
+    assert table.schema.types == [pa.int64(), pa.string(), pa.timestamp('ms')]
+    assert table.to_pylist() == [
+        {'ID': 1, 'Title': 'a', 'Due': datetime(2024, 1, 2, 3, 4, 5)},
+        {'ID': 2, 'Title': 'b,c', 'Due': None}
+    ]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2024-01-02', True),
+    ('2024-01-02T03:04:05Z', True),
+    ('2024-01-02 03:04:05.123+02:00', True),
+    ('2024-13-02', False),
+    ('02/01/2024', False),
+    ('soon', False),
+    (20240102, False)
+])
+def test_is_valid_datetime(value, expected):
+    assert api._is_valid_datetime(value) is expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    (5, True),
+    (2.5, True),
+    ('3.5', True),
+    (' -1e3 ', True),
+    ('.5', True),
+    ('1.2.3', False),
+    ('abc', False),
+    ('', False),
+    ([1], False)
+])
+def test_is_valid_number(value, expected):
+    assert api._is_valid_number(value) is expected
+
+
+def test_validate_reports_every_problem(validating_http):
+    response = validating_http.post('/api/validate', json={
+        'Due': '2024-02-30',
+        'Status': 'Closed',
+        'Amount': 'lots',
+        'Unknown': 'ignored'
+    })
+
+    assert response.get_json() == {
+        'valid': False,
+        'errors': [
+            'Title is required',
+            'Due has invalid date format',
+            'Status has invalid choice: Closed',
+            'Amount must be a number'
+        ]
+    }
+
+
+def test_validate_accepts_good_values(validating_http):
+    response = validating_http.post('/api/validate', json={
+        'Title': 'a', 'Due': '2024-02-28', 'Status': 'Open', 'Amount': '3.5'
+    })
+
+    assert response.get_json() == {'valid': True, 'errors': []}
+
+
+def test_validate_rejects_unhashable_choice(validating_http):
+    response = validating_http.post('/api/validate', json={'Title': 'a', 'Status': ['Open']})
+
+    assert response.get_json()['errors'] == ["Status has invalid choice: ['Open']"]
+
+
+def test_search_disabled_without_pushdown(http, fake_client):
+    http.application.config['SEARCH_PUSHDOWN_ENABLED'] = False
+
+    response = http.post('/api/search', json={'searchTerm': 'a'})
+
+    assert response.status_code == 501
+    assert fake_client.pages_served == 0
+
+
+def test_search_pushes_the_term_down(http, fake_client):
+    response = http.post('/api/search', json={'searchTerm': 'b', 'page': 2, 'pageSize': 1})
+
+    assert response.status_code == 200
+    assert fake_client.last_query == (2, 1, {'contains': 'b'})
+    assert response.get_json()['items'] == ITEMS[1:]
+
+
+def test_data_ndjson_streams_one_page(http, fake_client):
+    response = http.get('/api/data.ndjson?page=2&pageSize=1')
+    lines = [orjson.loads(line) for line in response.get_data().splitlines()]
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert lines == [{'fields': FIELDS, 'total': 2, 'page': 2, 'page_size': 1}, ITEMS[1]]
+    assert fake_client.last_query == (2, 1, None)
+
+    etag = response.headers['ETag']
+    assert http.get('/api/data.ndjson?page=2&pageSize=1', headers={'If-None-Match': etag}).status_code == 304
+    # The JSON representation of the same page has its own tag
+    assert http.get('/api/data?page=2&pageSize=1', headers={'If-None-Match': etag}).status_code == 200
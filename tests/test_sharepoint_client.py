@@ -0,0 +1,312 @@
+from xml.etree.ElementTree import Element, fromstring
+
+import pytest
+import requests
+from office365.runtime.auth.authentication_context import AuthenticationContext
+from office365.sharepoint.client_context import ClientContext
+from office365.sharepoint.webs.context_web_information import ContextWebInformation
+
+from app import sharepoint_client
+from app.sharepoint_client import SharePointClient
+
+SITE_URL = 'https://contoso.sharepoint.com/sites/test'
+
+FIELDS = [
+    {'name': 'Title', 'title': 'Title', 'type': 'Text', 'required': True, 'choices': []},
+    {'name': 'Notes', 'title': 'Notes', 'type': 'Note', 'required': False, 'choices': []},
+    {'name': 'Status', 'title': 'Status', 'type': 'Choice', 'required': False, 'choices': ['Open', 'Done']},
+    {'name': 'Amount', 'title': 'Amount', 'type': 'Number', 'required': False, 'choices': []},
+    {'name': 'Due', 'title': 'Due', 'type': 'DateTime', 'required': False, 'choices': []},
+    {'name': 'Owner', 'title': 'Owner', 'type': 'User', 'required': False, 'choices': []},
+    {'name': 'Custom', 'title': 'Custom', 'type': 'Calculated', 'required': False, 'choices': []}
+]
+
+
+class FakeItem:
+    def __init__(self, properties):
+        self.properties = properties
+
+
+class FakeList:
+    """Serves Id-ordered items for CAML queries, honouring RowLimit and p_ID paging tokens"""
+    def __init__(self, count):
+        self.count = count
+        self.queries = []
+    
+    def get_items(self, query):
+        self.queries.append(query)
+        row_limit = int(fromstring(query['ViewXml']).find('RowLimit').text)
+        paging_info = query.get('ListItemCollectionPosition', {}).get('PagingInfo', 'p_ID=0')
+        after = int(paging_info.rpartition('p_ID=')[2])
+        return [FakeItem({'Id': item_id, 'Title': f't{item_id}'})
+                for item_id in range(after + 1, min(after + row_limit, self.count) + 1)]
+
+
+class FakeContext:
+    def load(self, *args):
+        pass
+    
+    def execute_query(self):
+        pass
+
+
+class FakeSession:
+    """Records the requests sent through the pooled session, failing them unless a status is set"""
+    def __init__(self):
+        self.requests = []
+        self.status_code = None
+    
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        if self.status_code is None:
+            raise requests.ConnectionError('offline')
+        response = requests.Response()
+        response.status_code = self.status_code
+        response._content = b''
+        return response
+    
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+
+@pytest.fixture
+def client():
+    # The CAML helpers only need the instance, not a configured app
+    return SharePointClient.__new__(SharePointClient)
+
+
+@pytest.fixture
+def online_client(monkeypatch):
+    # A real client context whose auth and form digest need no network
+    auth_ctx = AuthenticationContext(url=SITE_URL)
+    auth_ctx.authenticate_request = lambda request: None
+    ctx = ClientContext(SITE_URL, auth_ctx)
+    ctx._ctx_web_info = ContextWebInformation('digest', 1800)
+    
+    client = SharePointClient.__new__(SharePointClient)
+    client.site_url = SITE_URL
+    client.list_name = 'Tasks'
+    client.pool_size = 4
+    client.use_batch = True
+    client.ctx = ctx
+    client.list_obj = ctx.web.lists.get_by_title('Tasks')
+    
+    session = FakeSession()
+    monkeypatch.setattr(sharepoint_client, '_get_http_session', lambda pool_size: session)
+    sharepoint_client._item_types[(SITE_URL, 'Tasks')] = ('SP.Data.TasksListItem', 'list-guid')
+    yield client, session
+    sharepoint_client._item_types.clear()
+
+
+@pytest.fixture
+def paged_client():
+    client = SharePointClient.__new__(SharePointClient)
+    client.site_url = SITE_URL
+    client.list_name = 'Tasks'
+    client.ctx = FakeContext()
+    client.list_obj = FakeList(45)
+    client.get_list_fields = lambda: FIELDS
+    sharepoint_client._change_token_cache[(SITE_URL, 'Tasks')] = ('token-1', 45)
+    yield client
+    for cache in (sharepoint_client._change_token_cache, sharepoint_client._page_cache,
+                  sharepoint_client._page_cursors):
+        cache.clear()
+
+
+def _view(query):
+    return fromstring(query['ViewXml'])
+
+
+def test_combine_clauses_nests_from_the_right(client):
+    clauses = [Element('A'), Element('B'), Element('C')]
+    combined = client._combine_clauses('And', clauses)
+
+    assert combined.tag == 'And'
+    assert [child.tag for child in combined] == ['A', 'And']
+    assert [child.tag for child in combined[1]] == ['B', 'C']
+
+
+def test_combine_clauses_single_and_empty(client):
+    clause = Element('Eq')
+    assert client._combine_clauses('Or', [clause]) is clause
+    assert client._combine_clauses('Or', []) is None
+
+
+def test_build_where_defaults_to_eq_with_field_type(client):
+    where = client._build_where({'Amount': 5}, FIELDS)
+
+    assert where.tag == 'Eq'
+    assert where.find('FieldRef').get('Name') == 'Amount'
+    value = where.find('Value')
+    assert value.get('Type') == 'Number'
+    assert value.text == '5'
+
+
+def test_build_where_operator_dict_and_unknown_fields(client):
+    where = client._build_where({
+        'Title': {'op': 'beginsWith', 'value': 'Re'},
+        'Missing': 'x',
+        'Custom': {'op': 'ne', 'value': True}
+    }, FIELDS)
+
+    assert where.tag == 'And'
+    begins, neq = list(where)
+    assert begins.tag == 'BeginsWith'
+    assert neq.tag == 'Neq'
+    # Types CAML cannot compare directly fall back to Text; booleans become 1/0
+    assert neq.find('Value').get('Type') == 'Text'
+    assert neq.find('Value').text == '1'
+
+
+def test_build_where_rejects_unknown_operator(client):
+    with pytest.raises(ValueError):
+        client._build_where({'Title': {'op': 'like', 'value': 'x'}}, FIELDS)
+
+
+def test_build_where_search_covers_text_fields(client):
+    where = client._build_where({'contains': 'abc'}, FIELDS)
+
+    assert where.tag == 'Or'
+    names = [el.find('FieldRef').get('Name') for el in where.iter('Contains')]
+    assert names == ['Title', 'Notes', 'Status']
+    assert client._build_where({'contains': ''}, FIELDS) is None
+    assert client._build_where(None, FIELDS) is None
+
+
+def test_build_caml_query_full_view(client):
+    query = client._build_caml_query({'Status': 'Open'}, 'Due', 'desc', page_size=50,
+                                     paging_info='Paged=TRUE&p_ID=10', fields=FIELDS,
+                                     view_fields=['ID', 'Due'])
+    view = _view(query)
+
+    assert [el.get('Name') for el in view.find('ViewFields')] == ['ID', 'Due']
+    assert view.find('Query/Where/Eq/FieldRef').get('Name') == 'Status'
+    order = view.find('Query/OrderBy/FieldRef')
+    assert (order.get('Name'), order.get('Ascending')) == ('Due', 'FALSE')
+    row_limit = view.find('RowLimit')
+    assert (row_limit.text, row_limit.get('Paged')) == ('50', 'TRUE')
+    assert query['ListItemCollectionPosition'] == {'PagingInfo': 'Paged=TRUE&p_ID=10'}
+
+
+def test_build_caml_query_drops_unknown_sort_field(client):
+    view = _view(client._build_caml_query(sort_field='Nope', fields=FIELDS))
+
+    assert view.find('Query/OrderBy') is None
+    assert view.find('Query/Where') is None
+    assert 'ListItemCollectionPosition' not in client._build_caml_query(fields=FIELDS)
+
+
+def test_build_caml_query_escapes_values(client):
+    query = client._build_caml_query({'Title': 'a<b&c'}, fields=FIELDS)
+
+    assert _view(query).find('Query/Where/Eq/Value').text == 'a<b&c'
+
+
+def test_paging_token_by_id(client):
+    item = FakeItem({'Id': 42, 'Due': '2024-01-01T00:00:00Z'})
+
+    assert client._paging_token(item) == 'Paged=TRUE&p_ID=42'
+    assert client._paging_token(item, 'ID') == 'Paged=TRUE&p_ID=42'
+
+
+def test_paging_token_quotes_sort_value(client):
+    item = FakeItem({'Id': 7, 'Title': 'a b&c'})
+
+    assert client._paging_token(item, 'Title') == 'Paged=TRUE&p_Title=a%20b%26c&p_ID=7'
+    assert client._paging_token(FakeItem({'Id': 7}), 'Title') == 'Paged=TRUE&p_Title=&p_ID=7'
+
+
+def test_bulk_update_batches_typed_writes_over_pooled_session(online_client):
+    client, session = online_client
+
+    result = client.bulk_update([
+        {'action': 'create', 'data': {'Title': 'a'}},
+        {'action': 'update', 'id': 5, 'data': {'Title': 'b'}},
+        {'action': 'delete', 'id': 6}
+    ])
+
+    assert len(session.requests) == 1
+    method, url, kwargs = session.requests[0]
+    body = kwargs['data'].decode()
+    assert (method, url) == ('POST', SITE_URL + '/_api/$batch')
+    assert body.count('SP.Data.TasksListItem') == 2
+    assert '"SP.ListItem"' not in body
+    assert 'ParentList' not in body
+    assert 'GET ' not in body
+    # The batch failed as a whole, so every operation is reported
+    assert result['success'] is False
+    assert [e['action'] for e in result['errors']] == ['create', 'update', 'delete']
+
+
+def test_update_item_sends_a_single_merge(online_client):
+    client, session = online_client
+    session.status_code = 204
+    sharepoint_client._use_pooled_session(client.ctx.pending_request(), session)
+
+    assert client.update_item(5, {'Title': 'b'}) is True
+
+    assert len(session.requests) == 1
+    method, url, kwargs = session.requests[0]
+    assert method == 'POST'
+    assert url.endswith("/_api/Web/lists/GetByTitle('Tasks')/getItemById(5)")
+    assert kwargs['headers']['X-HTTP-Method'] == 'MERGE'
+    assert kwargs['json']['__metadata']['type'] == 'SP.Data.TasksListItem'
+
+
+def test_get_list_items_reuses_page_cursors(paged_client):
+    data = paged_client.get_list_items(page=3, page_size=10)
+
+    assert [item['ID'] for item in data['items']] == list(range(21, 31))
+    assert data['total'] == 45
+    # One ID-only walk over the first two pages, then the page itself
+    assert len(paged_client.list_obj.queries) == 2
+
+    data = paged_client.get_list_items(page=4, page_size=10)
+
+    assert [item['ID'] for item in data['items']] == list(range(31, 41))
+    assert len(paged_client.list_obj.queries) == 3
+    assert paged_client.list_obj.queries[-1]['ListItemCollectionPosition'] == {'PagingInfo': 'Paged=TRUE&p_ID=30'}
+
+
+def test_get_list_items_past_the_end(paged_client):
+    data = paged_client.get_list_items(page=6, page_size=10)
+
+    assert data['items'] == []
+    assert data['total'] == 45
+
+
+def test_get_list_items_filtered_total_counts_pages_so_far(paged_client):
+    data = paged_client.get_list_items(page=2, page_size=10, filters={'Title': 't'})
+
+    assert len(data['items']) == 10
+    assert data['total'] == 20
+
+
+def test_get_list_items_serves_cached_pages_per_change_token(paged_client):
+    first = paged_client.get_list_items(page=1, page_size=10)
+
+    assert paged_client.get_list_items(page=1, page_size=10) is first
+    assert len(paged_client.list_obj.queries) == 1
+
+    # A new change token means the list changed, so the page is fetched again
+    sharepoint_client._change_token_cache[(SITE_URL, 'Tasks')] = ('token-2', 45)
+    assert paged_client.get_list_items(page=1, page_size=10) is not first
+    assert len(paged_client.list_obj.queries) == 2
+
+
+def test_list_fields_cached_per_list(monkeypatch):
+    client = SharePointClient.__new__(SharePointClient)
+    client.site_url = SITE_URL
+    client.list_name = 'Tasks'
+    fetched = [[], FIELDS]
+    monkeypatch.setattr(client, '_fetch_list_fields', lambda: fetched.pop(0))
+
+    try:
+        # A failed fetch is not cached, so the next call asks again
+        assert client.get_list_fields() == []
+        assert client.get_list_fields() == FIELDS
+        assert client.get_fields_index()['required'] == [('Title', 'Title')]
+        assert client.get_fields_index()['by_name']['Status'][2] == frozenset({'Open', 'Done'})
+        assert fetched == []
+    finally:
+        sharepoint_client._fields_cache.clear()
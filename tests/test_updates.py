@@ -0,0 +1,502 @@
+from datetime import datetime
+from xml.etree.ElementTree import fromstring
+
+import pandas as pd
+import pytest
+import requests
+from office365.runtime.auth.authentication_context import AuthenticationContext
+from office365.sharepoint.client_context import ClientContext
+from office365.sharepoint.webs.context_web_information import ContextWebInformation
+from shareplum.errors import ShareplumRequestError
+from shareplum.list import _List2007
+
+import updates
+from updates import SharePointClient, _is_unauthorized, _lookup_tail, _with_reauth
+
+
+@pytest.fixture
+def client():
+    # The helpers under test only need the list identity, not a configured app
+    client = SharePointClient.__new__(SharePointClient)
+    client.site_url = 'https://sharepoint.example.com/sites/test'
+    client.list_name = 'Tasks'
+    return client
+
+
+ONLINE_SITE_URL = 'https://contoso.sharepoint.com/sites/test'
+
+
+class FakeSession:
+    """Records the requests office365 sends through the pooled Online session and fails them"""
+    def __init__(self):
+        self.requests = []
+    
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        raise requests.ConnectionError('offline')
+    
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+
+def _online_auth_context():
+    # A real auth context that needs no network
+    auth_ctx = AuthenticationContext(url=ONLINE_SITE_URL)
+    auth_ctx.authenticate_request = lambda request: None
+    return auth_ctx
+
+
+@pytest.fixture
+def online_session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setitem(updates._SESSIONS, (ONLINE_SITE_URL, 'user', 'online'), session)
+    return session
+
+
+@pytest.fixture
+def online_client():
+    # A loaded list binding on a real client context
+    ctx = ClientContext(ONLINE_SITE_URL, _online_auth_context())
+    ctx._ctx_web_info = ContextWebInformation('digest', 1800)
+    
+    client = SharePointClient.__new__(SharePointClient)
+    client.site_url = ONLINE_SITE_URL
+    client.username = 'user'
+    client.list_name = 'Tasks'
+    client.ctx = ctx
+    client.site = None
+    client.list_obj = ctx.web.lists.get_by_title('Tasks')
+    for name, value in {'Id': 'list-guid', 'ListItemEntityTypeFullName': 'SP.Data.TasksListItem'}.items():
+        client.list_obj.set_property(name, value, False)
+    client.get_list = lambda: client.list_obj
+    return client
+
+
+LIST_ITEMS_RESPONSE = '''<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>
+<GetListItemsResponse xmlns="http://schemas.microsoft.com/sharepoint/soap/"><GetListItemsResult>
+<listitems xmlns:rs="urn:schemas-microsoft-com:rowset" xmlns:z="#RowsetSchema"><rs:data ItemCount="2">
+<z:row ows_ID="2" ows_Title="b" ows_Due_x0020_Date="x" />
+<z:row ows_ID="1" ows_Title="a" ows_Due_x0020_Date="y" />
+</rs:data></listitems></GetListItemsResult></GetListItemsResponse></soap:Body></soap:Envelope>'''
+
+
+LIST_RESPONSE = '''<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>
+<GetListResponse xmlns="http://schemas.microsoft.com/sharepoint/soap/"><GetListResult>
+<List Title="Tasks" ItemCount="42"><Fields /></List>
+</GetListResult></GetListResponse></soap:Body></soap:Envelope>'''
+
+
+class FakeSoapSession:
+    """Records the SOAP requests posted by a Shareplum list and answers them with a canned body"""
+    def __init__(self, text):
+        self.text = text
+        self.sent = []
+    
+    def post(self, url, **kwargs):
+        self.sent.append(kwargs['data'].decode())
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.text.encode()
+        return response
+
+
+@pytest.fixture
+def onprem_client(client):
+    # A Shareplum list built without its GetList/GetViewCollection round trips
+    sp_list = _List2007.__new__(_List2007)
+    sp_list.list_name = 'Tasks'
+    sp_list._url = lambda service: f'{client.site_url}/_vti_bin/{service}.asmx'
+    sp_list._verify_ssl = True
+    sp_list.users = None
+    sp_list.huge_tree = False
+    sp_list.timeout = None
+    sp_list._sp_cols = {
+        'ID': {'name': 'ID', 'type': 'Counter'},
+        'Title': {'name': 'Title', 'type': 'Text'},
+        'Due_x0020_Date': {'name': 'Due Date', 'type': 'Text'}
+    }
+    sp_list._disp_cols = {value['name']: {'name': key, 'type': value['type']}
+                          for key, value in sp_list._sp_cols.items()}
+    sp_list._session = FakeSoapSession(LIST_ITEMS_RESPONSE)
+    
+    client.sp_list = sp_list
+    client.get_field_types = lambda: {'ID': 'Counter', 'Title': 'Text', 'Due Date': 'Text'}
+    client.__dict__['is_onprem'] = True
+    yield client
+    updates._ITEM_COUNTS.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_datetime_formats():
+    updates._DATETIME_FORMAT_CACHE.clear()
+    yield
+    updates._DATETIME_FORMAT_CACHE.clear()
+
+
+def test_batch_errors_maps_failed_rows_to_updates(client):
+    group = [
+        ({'id': None, 'action': 'create'}, {'Title': 'a'}),
+        ({'id': None, 'action': 'create'}, {'Title': 'b'}),
+        ({'id': None, 'action': 'create'}, {'Title': 'c'})
+    ]
+    result = {
+        '1,New': '0x00000000',
+        '2,New': ('0x81020014', 'Invalid value'),
+        '3,New': ('0x81020015', '')
+    }
+
+    errors = client._batch_errors(result, group)
+
+    assert errors == [
+        {'id': None, 'action': 'create', 'error': 'Invalid value'},
+        {'id': None, 'action': 'create', 'error': '0x81020015'}
+    ]
+
+
+def test_batch_errors_ignores_unexpected_results(client):
+    group = [({'id': 1, 'action': 'delete'}, {'ID': 1})]
+
+    assert client._batch_errors(None, group) == []
+    assert client._batch_errors({'9,Delete': ('0x1', 'gone')}, group) == [
+        {'id': None, 'action': None, 'error': 'gone'}
+    ]
+
+
+def test_format_lookup_column(client):
+    column = pd.Series(['1;#Bob', {'Title': 'Ann'}, '', None, 5], dtype=object)
+
+    assert client._format_lookup_column(column).tolist() == ['Bob', 'Ann', '', None, '5']
+
+
+def test_split_filters_pushes_only_text_fields(client):
+    field_types = {'Title': 'Text', 'Notes': 'Note', 'Status': 'Choice', 'Amount': 'Number'}
+
+    pushed, residual = client._split_filters(
+        {'Title': 'abc', 'Notes': 5, 'Status': '', 'Amount': 3, 'Missing': 'x'}, field_types
+    )
+
+    assert pushed == {'Title': 'abc', 'Notes': '5'}
+    assert residual == {'Status': '', 'Amount': 3, 'Missing': 'x'}
+    assert client._split_filters(None, field_types) == ({}, {})
+
+
+def test_build_shareplum_query(client):
+    query = client._build_shareplum_query({'Title': 'a', 'Notes': 'b'}, 'Title', 'desc', after_id=10)
+
+    assert query == {
+        'Where': ['And', ('Contains', 'Title', 'a'), 'And', ('Contains', 'Notes', 'b'), ('Gt', 'ID', 10)],
+        'OrderBy': [('Title', 'DESCENDING')]
+    }
+    assert client._build_shareplum_query() == {}
+
+
+def test_format_datetime_column(client):
+    column = pd.Series([
+        '2024-01-02T03:04:05Z',
+        '1/2/2024',
+        '',
+        None,
+        'garbage',
+        datetime(2024, 1, 2, 3, 4, 5)
+    ], dtype=object)
+
+    formatted = client._format_datetime_column(column, 'Due')
+
+    assert formatted.tolist() == [
+        '2024-01-02 03:04:05',
+        '2024-01-02 00:00:00',
+        '',
+        None,
+        'garbage',
+        '2024-01-02 03:04:05'
+    ]
+    # The input column is left untouched
+    assert column[0] == '2024-01-02T03:04:05Z'
+
+
+def test_format_datetime_column_caches_detected_format(client):
+    client._format_datetime_column(pd.Series(['01/02/2024', '12/31/2023'], dtype=object), 'Due')
+
+    key = (client.site_url, client.list_name, 'Due')
+    assert updates._DATETIME_FORMAT_CACHE[key] == '%m/%d/%Y'
+
+
+def test_format_datetime_column_empty(client):
+    formatted = client._format_datetime_column(pd.Series([None, ''], dtype=object), 'Due')
+
+    assert formatted.tolist() == [None, '']
+
+
+def test_apply_filters_casefolds_and_narrows(client):
+    df = pd.DataFrame({'Title': ['Straße', 'Other', 'Third'], 'Code': ['A1', 'A2', 'B1']}, dtype=object)
+
+    assert client._apply_filters(df, {'Title': 'STRASSE'})['Code'].tolist() == ['A1']
+    assert client._apply_filters(df, {'Code': 'a', 'Title': 'oth'})['Code'].tolist() == ['A2']
+    assert client._apply_filters(df, {'Title': ''})['Code'].tolist() == ['A1', 'A2', 'B1']
+    assert client._apply_filters(df, {'Missing': 'x'}).empty
+
+
+def test_apply_filters_skips_missing_cells(client):
+    df = pd.DataFrame({'Status': ['Done', None, 'Ongoing'], 'Code': ['A1', 'A2', 'B1']}, dtype=object)
+
+    assert client._apply_filters(df, {'Status': 'on'})['Code'].tolist() == ['A1', 'B1']
+    assert client._apply_filters(df, {'Status': 'none'}).empty
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1;#Bob', 'Bob'),
+    ('1;#A;#2;#B', 'A'),
+    ('3;#', ''),
+    ('plain', 'plain'),
+    ({'Title': 'Ann'}, 'Ann'),
+    ({'Email': 'x'}, "{'Email': 'x'}"),
+    (5, '5'),
+    (None, '')
+])
+def test_lookup_tail(value, expected):
+    assert _lookup_tail(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 'Text'),
+    ('2024-01-02T03:04:05Z', 'DateTime'),
+    ('1/2/2024', 'DateTime'),
+    ('12', 'Integer'),
+    ('-7', 'Integer'),
+    ('3.5', 'Number'),
+    ('1e5', 'Number'),
+    ('1.', 'Text'),
+    ('true', 'Boolean'),
+    ('False', 'Boolean'),
+    ('hello', 'Text'),
+    ('', 'Text')
+])
+def test_guess_field_type(client, value, expected):
+    assert client._guess_field_type(value) == expected
+
+
+def test_bulk_update_online_types_batched_writes(online_client, online_session):
+    result = online_client._bulk_update_online([
+        {'action': 'create', 'data': {'Title': 'a'}},
+        {'action': 'update', 'id': 5, 'data': {'Title': 'b'}}
+    ])
+
+    # One $batch, sent over the pooled session
+    assert len(online_session.requests) == 1
+    method, url, kwargs = online_session.requests[0]
+    body = kwargs['data'].decode()
+    assert (method, url) == ('POST', ONLINE_SITE_URL + '/_api/$batch')
+    assert body.count('SP.Data.TasksListItem') == 2
+    assert '"SP.ListItem"' not in body
+    assert 'ParentList' not in body
+    assert result['success'] is False
+
+
+def _sent_query(client):
+    """Return the <Query> and rowLimit text of the first GetListItems request the list posted"""
+    envelope = fromstring(client.sp_list._session.sent[0].encode())
+    row_limit = envelope.find('.//{http://schemas.microsoft.com/sharepoint/soap/}rowLimit')
+    return envelope.find('.//Query'), row_limit.text
+
+
+def test_get_onprem_frame_sends_sort_and_filters(onprem_client):
+    df = onprem_client._get_onprem_frame(10, {'Due Date': 'x'}, sort_field='Title', sort_order='desc',
+                                         select_fields=['ID', 'Title', 'Due Date'])
+
+    query, row_limit = _sent_query(onprem_client)
+    order = query.find('OrderBy/FieldRef')
+    assert (order.get('Name'), order.get('Ascending')) == ('Title', 'FALSE')
+    contains = query.find('Where/Contains')
+    assert contains.find('FieldRef').get('Name') == 'Due_x0020_Date'
+    assert (contains.find('Value').get('Type'), contains.find('Value').text) == ('Text', 'x')
+    assert row_limit == '10'
+    # Rows keep the order SharePoint returned them in, under their display names
+    assert df.to_dict('records') == [
+        {'ID': '2', 'Title': 'b', 'Due Date': 'x'},
+        {'ID': '1', 'Title': 'a', 'Due Date': 'y'}
+    ]
+
+
+def test_get_onprem_frame_defaults_to_id_order(onprem_client):
+    onprem_client._get_onprem_frame(10, after_id=5)
+
+    query, _ = _sent_query(onprem_client)
+    assert [(el.get('Name'), el.get('Ascending')) for el in query.find('OrderBy')] == [('ID', None)]
+    gt = query.find('Where/Gt')
+    assert gt.find('FieldRef').get('Name') == 'ID'
+    assert gt.find('Value').text == '5'
+
+
+def test_get_item_count_reads_list_and_caches(onprem_client):
+    session = onprem_client.sp_list._session
+    session.text = LIST_RESPONSE
+
+    assert onprem_client.get_item_count() == 42
+    assert onprem_client.get_item_count() == 42
+
+    assert len(session.sent) == 1
+    envelope = fromstring(session.sent[0].encode())
+    assert envelope.find('.//{http://schemas.microsoft.com/sharepoint/soap/}GetList') is not None
+
+
+def test_get_item_count_caches_missing_count(onprem_client):
+    session = onprem_client.sp_list._session
+    session.text = LIST_RESPONSE.replace(' ItemCount="42"', '')
+
+    assert onprem_client.get_item_count() is None
+    assert onprem_client.get_item_count() is None
+    assert len(session.sent) == 1
+
+
+def test_list_fields_cached_until_invalidated(client, monkeypatch):
+    fields = [{'name': 'Title', 'title': 'Title', 'type': 'Text', 'required': True, 'choices': []}]
+    fetched = [None, fields, fields]
+    monkeypatch.setattr(client, '_get_onprem_fields', lambda: fetched.pop(0))
+
+    try:
+        # A failed lookup falls back to the defaults without caching them
+        assert client.get_list_fields() == client._get_default_fields()
+        assert client.get_list_fields() == fields
+        assert client.get_field_types() == {'Title': 'Text'}
+        assert len(fetched) == 1
+
+        client.invalidate_fields_cache()
+        assert client.get_list_fields() == fields
+        assert fetched == []
+    finally:
+        updates._FIELDS_CACHE.clear()
+
+
+def test_list_items_cached_until_invalidated(client, monkeypatch):
+    pages = [
+        {'items': [], 'total': 0, 'fields': []},
+        {'items': [{'ID': 1}], 'total': 1, 'fields': [], 'page': 1, 'page_size': 10},
+        {'items': [{'ID': 2}], 'total': 1, 'fields': [], 'page': 1, 'page_size': 10}
+    ]
+    monkeypatch.setattr(client, '_get_onprem_items', lambda *args: pages.pop(0))
+
+    try:
+        # Failed fetches come back without 'page' and are not cached
+        assert 'page' not in client.get_list_items(page=1, page_size=10)
+        assert client.get_list_items(page=1, page_size=10)['items'] == [{'ID': 1}]
+        assert client.get_list_items(page=1, page_size=10)['items'] == [{'ID': 1}]
+        assert len(pages) == 1
+
+        client.invalidate_items_cache()
+        assert client.get_list_items(page=1, page_size=10)['items'] == [{'ID': 2}]
+    finally:
+        updates._ITEMS_CACHE.clear()
+
+
+def test_onprem_export_pages_continue_after_highest_id(client, monkeypatch):
+    frames = [
+        pd.DataFrame({'ID': ['9', '10', '2']}, dtype=object),
+        pd.DataFrame({'ID': ['11']}, dtype=object)
+    ]
+    after_ids = []
+
+    def get_frame(size, sort_field=None, after_id=None):
+        after_ids.append(after_id)
+        return frames.pop(0)
+
+    monkeypatch.setattr(updates, 'EXPORT_PAGE_SIZE', 3)
+    monkeypatch.setattr(client, '_get_onprem_frame', get_frame)
+
+    pages = list(client._iter_onprem_export_pages(10))
+
+    assert [len(page) for page in pages] == [3, 1]
+    assert after_ids == [None, 10]
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f'{status_code} error', response=response)
+
+
+def test_is_unauthorized_follows_wrapped_errors():
+    class RejectingSession:
+        def post(self, url, **kwargs):
+            response = requests.Response()
+            response.status_code = 401
+            response.url = url
+            return response
+
+    # Shareplum re-raises the HTTP error as ShareplumRequestError
+    with pytest.raises(ShareplumRequestError) as shareplum_error:
+        updates.post(RejectingSession(), 'https://sharepoint.example.com/_vti_bin/Lists.asmx')
+
+    assert _is_unauthorized(shareplum_error.value)
+    assert _is_unauthorized(_http_error(401))
+    assert not _is_unauthorized(_http_error(403))
+    assert not _is_unauthorized(ValueError('boom'))
+
+    try:
+        raise RuntimeError('request failed') from _http_error(401)
+    except RuntimeError as e:
+        assert _is_unauthorized(e)
+
+
+class Reauthenticating:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.resets = 0
+
+    def _reset_auth(self):
+        self.resets += 1
+
+    @_with_reauth({'success': False})
+    def call(self):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_with_reauth_retries_once_after_401():
+    client = Reauthenticating(_http_error(401), 'ok')
+
+    assert client.call() == 'ok'
+    assert client.resets == 1
+
+
+def test_with_reauth_gives_up_after_second_401():
+    client = Reauthenticating(_http_error(401), _http_error(401))
+
+    assert client.call() == {'success': False}
+    assert client.resets == 1
+
+
+def test_with_reauth_lets_other_errors_through():
+    client = Reauthenticating(_http_error(500))
+
+    with pytest.raises(requests.HTTPError):
+        client.call()
+    assert client.resets == 0
+
+
+def test_online_requests_use_the_pooled_session(online_session, monkeypatch):
+    client = SharePointClient.__new__(SharePointClient)
+    client.site_url = ONLINE_SITE_URL
+    client.username = 'user'
+    monkeypatch.setattr(client, '_get_online_auth_context', _online_auth_context)
+
+    assert client._authenticate_online()
+    with pytest.raises(requests.ConnectionError):
+        client.ctx.web.get().execute_query()
+
+    assert [(method, url) for method, url, _ in online_session.requests] == [('GET', ONLINE_SITE_URL + '/_api/Web')]
+
+
+def test_pooled_sessions_match_shareplum(monkeypatch):
+    monkeypatch.setattr(updates, '_SESSIONS', {})
+
+    session = updates._get_session(('https://sharepoint.example.com', 'user', 'ntlm'), None)
+
+    assert session.headers['user-agent'] == 'shareplum/0.5.1'
+    retry = session.get_adapter('https://sharepoint.example.com').max_retries
+    assert (retry.total, retry.connect, retry.read) == (5, 5, 5)
+    assert retry.status_forcelist == [500, 502, 503, 504]
+    assert updates._get_session(('https://sharepoint.example.com', 'user', 'ntlm'), None) is session
@@ -1,32 +1,232 @@
+import asyncio
+import copy
 import json
+import orjson
+import re
+import threading
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache, wraps
 from datetime import datetime
+from urllib.parse import quote
+from xml.etree.ElementTree import Element, SubElement, tostring
 from flask import current_app
 import logging
 
 # Office365 imports for SharePoint Online
 from office365.runtime.auth.user_credential import UserCredential
+from office365.runtime.http.http_method import HttpMethod
+from office365.runtime.odata.v3.batch_request import ODataBatchV3Request
+from office365.runtime.odata.v3.json_light_format import JsonLightFormat
 from office365.sharepoint.client_context import ClientContext
 
 # Shareplum imports for on-premises SharePoint
 from shareplum import Site, Office365
+from shareplum.request_helper import post
 from shareplum.site import Version
+from shareplum.soap import Soap
+from shareplum.version import __version__ as SHAREPLUM_VERSION
+from lxml import etree
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from requests_ntlm import HttpNtlmAuth
+from cachetools import LRUCache, TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Sessions and auth contexts are shared by every client in the process so each
+# SharePoint call reuses a pooled, already-authenticated connection
+_SESSIONS = {}
+_AUTH_CONTEXTS = {}
+_AUTH_LOCK = threading.Lock()
+ONLINE_TOKEN_TTL = 1800
+
+# Value shapes used by _guess_field_type
+_DATETIME_RE = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}|\d{1,2}/\d{1,2}/\d{4}|\d{4}-\d{2}-\d{2}')
+_NUM_RE = re.compile(r'^-?\d+(\.\d+)?([eE][+-]?\d+)?$')
+_BOOL_SET = frozenset({'true', 'false', '1', '0'})
+
+# Date formats Shareplum returns, most common first; the one that matches a
+# column is remembered per (site, list, column) so later pages parse in one pass
+DATETIME_FORMATS = (
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+    '%Y-%m-%d %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y',
+    '%Y-%m-%d'
+)
+_DATETIME_FORMAT_CACHE = {}
+
+# Field types SharePoint can evaluate a <Contains> filter against
+CAML_CONTAINS_TYPES = ('Text', 'Note', 'Choice')
+
+# Exports are fetched and converted to DataFrames this many rows at a time
+EXPORT_PAGE_SIZE = 5000
+
+# List schemas are effectively static, so field definitions are cached per list
+FIELDS_CACHE_TTL = 900
+_FIELDS_CACHE = {}
+_FIELDS_LOCK = threading.Lock()
+
+# Item pages are served from memory for ITEMS_CACHE_TTL seconds; writes made
+# through any client in this process drop the list's cached pages at once
+ITEMS_CACHE_TTL = 60
+_ITEMS_CACHE = TTLCache(maxsize=256, ttl=ITEMS_CACHE_TTL)
+_ITEMS_LOCK = threading.Lock()
+_ITEM_COUNTS = TTLCache(maxsize=64, ttl=ITEMS_CACHE_TTL)
+# _ITEM_COUNTS holds None for lists that could not report a count
+_UNKNOWN_COUNT = object()
+
+# (site, list, query, page) -> ListItemCollectionPosition paging info where that
+# page starts, shared by every client so later pages skip the walk from row one
+_PAGE_CURSORS = LRUCache(maxsize=1024)
+
+# Largest row count a single query may touch before SharePoint's list view threshold rejects it
+LIST_VIEW_THRESHOLD = 5000
+
+def _get_session(key, auth):
+    """Return the pooled session for key, creating it with auth on first use"""
+    with _AUTH_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            session.auth = auth
+            # Same retry policy and user agent as the session Shareplum would have built
+            retry = Retry(total=5, read=5, connect=5, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+            adapter = HTTPAdapter(
+                pool_connections=10,
+                pool_maxsize=32,
+                max_retries=retry
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({'user-agent': f'shareplum/{SHAREPLUM_VERSION}'})
+            _SESSIONS[key] = session
+        return session
+
+def _close_sessions():
+    """Close and forget every pooled session"""
+    with _AUTH_LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
+        _AUTH_CONTEXTS.clear()
+
+def _use_session(client_request, session):
+    """Send client_request's HTTP calls through session instead of module-level requests calls
+    
+    office365 executes each request with requests.get/post, which opens a new
+    connection (and TLS handshake) per call; this mirrors its
+    execute_request_direct on a pooled session.
+    """
+    def execute_request_direct(request):
+        client_request.beforeExecute.notify(request)
+        kwargs = {
+            'headers': request.headers,
+            'auth': request.auth,
+            'verify': request.verify,
+            'proxies': request.proxies
+        }
+        
+        if request.method == HttpMethod.Get:
+            response = session.get(request.url, stream=request.stream, **kwargs)
+        elif request.method in (HttpMethod.Post, HttpMethod.Patch) and not (request.is_bytes or request.is_file):
+            response = session.request(request.method, request.url, json=request.data, **kwargs)
+        else:
+            response = session.request(request.method, request.url, data=request.data, **kwargs)
+        
+        response.raise_for_status()
+        return response
+    
+    client_request.execute_request_direct = execute_request_direct
+
+def _use_orjson(client_request):
+    """Make client_request decode its JSON responses with orjson instead of the stdlib json module"""
+    execute_request_direct = client_request.execute_request_direct
+    
+    def execute_with_orjson(request):
+        response = execute_request_direct(request)
+        # process_response reads the payload through response.json()
+        response.json = lambda **kwargs: orjson.loads(response.content)
+        return response
+    
+    client_request.execute_request_direct = execute_with_orjson
+
+def _lookup_tail(value):
+    """Return the display value of a User/Lookup cell: a dict's Title or the text after 'ID;#'"""
+    if isinstance(value, dict):
+        return value.get('Title', str(value))
+    if isinstance(value, str):
+        _, sep, tail = value.partition(';#')
+        # Multi-value lookups ("1;#A;#2;#B") show their first value
+        return tail.partition(';#')[0] if sep else value
+    return '' if value is None else str(value)
+
+def _is_unauthorized(error):
+    """True when a SharePoint call failed because the session or token is no longer accepted"""
+    # Shareplum raises ShareplumRequestError inside the except block that caught
+    # the HTTP error, so it arrives as __context__; other wrappers chain __cause__
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        response = getattr(error, 'response', None)
+        if getattr(response, 'status_code', None) == 401:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def _with_reauth(failure):
+    """Retry the wrapped call once after re-authenticating when SharePoint answers 401
+    
+    The wrapped method lets 401 errors propagate; any other outcome is returned as-is.
+    If the retry is rejected too, a copy of failure is returned.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except Exception as e:
+                if not _is_unauthorized(e):
+                    raise
+                logger.info(f"SharePoint rejected the session, re-authenticating: {str(e)}")
+            
+            self._reset_auth()
+            try:
+                return method(self, *args, **kwargs)
+            except Exception as e:
+                if not _is_unauthorized(e):
+                    raise
+                logger.error(f"SharePoint rejected the renewed session: {str(e)}")
+                return copy.deepcopy(failure)
+        return wrapper
+    return decorator
+
+@lru_cache(maxsize=1)
+def _load_config(app):
+    """Return (url, username, password, list name) from app's config, read once per app"""
+    return (
+        app.config['SHAREPOINT_URL'],
+        app.config['SHAREPOINT_USERNAME'],
+        app.config['SHAREPOINT_PASSWORD'],
+        app.config['SHAREPOINT_LIST_NAME']
+    )
+
 class SharePointClient:
     def __init__(self):
-        self.site_url = current_app.config['SHAREPOINT_URL']
-        self.username = current_app.config['SHAREPOINT_USERNAME']
-        self.password = current_app.config['SHAREPOINT_PASSWORD']
-        self.list_name = current_app.config['SHAREPOINT_LIST_NAME']
+        self.site_url, self.username, self.password, self.list_name = _load_config(current_app._get_current_object())
         self.ctx = None
         self.list_obj = None
         self.site = None
         self.sp_list = None
-        self.is_onprem = self._is_onpremise_url(self.site_url)
+    
+    @cached_property
+    def is_onprem(self):
+        """True when the site is on-premise SharePoint, decided once per client"""
+        return self._is_onpremise_url(self.site_url)
         
     def _is_onpremise_url(self, url):
         """Check if the URL is on-premise SharePoint (not sharepoint.com)"""
@@ -57,6 +257,10 @@ class SharePointClient:
                 version=Version.v2007  # Specify SharePoint 2007
             )
             
+            # Shareplum opens a private session per Site; swap in the pooled one
+            # so the NTLM handshake is done once per connection, not per call
+            self.site._session = _get_session((self.site_url, self.username, 'ntlm'), auth)
+            
             # Test connection by getting site information
             site_info = self.site.site_info
             logger.info(f"Successfully connected to on-premise SharePoint 2007: {site_info.get('Title', 'Unknown')}")
@@ -80,6 +284,7 @@ class SharePointClient:
                     auth=basic_auth,
                     version=Version.v2007
                 )
+                self.site._session = _get_session((self.site_url, self.username, 'basic'), basic_auth)
                 
                 site_info = self.site.site_info
                 logger.info(f"Successfully connected with basic auth to: {site_info.get('Title', 'Unknown')}")
@@ -94,10 +299,11 @@ class SharePointClient:
     def _authenticate_online(self):
         """Authenticate with SharePoint Online using Office365"""
         try:
-            from office365.runtime.auth.authentication_context import AuthenticationContext
-            auth_ctx = AuthenticationContext(url=self.site_url)
-            if auth_ctx.acquire_token_for_user(username=self.username, password=self.password):
+            auth_ctx = self._get_online_auth_context()
+            if auth_ctx:
                 self.ctx = ClientContext(self.site_url, auth_ctx)
+                _use_session(self.ctx.pending_request(), self._online_session())
+                _use_orjson(self.ctx.pending_request())
                 logger.info("Successfully authenticated with SharePoint Online")
                 return True
             else:
@@ -107,6 +313,45 @@ class SharePointClient:
             logger.error(f"SharePoint Online authentication error: {str(e)}")
             return False
     
+    def _get_online_auth_context(self):
+        """Return the cached SharePoint Online auth context, acquiring a token when expired"""
+        from office365.runtime.auth.authentication_context import AuthenticationContext
+        key = (self.site_url, self.username)
+        with _AUTH_LOCK:
+            cached = _AUTH_CONTEXTS.get(key)
+            if cached and time.monotonic() - cached[1] < ONLINE_TOKEN_TTL:
+                return cached[0]
+            
+            auth_ctx = AuthenticationContext(url=self.site_url)
+            if not auth_ctx.acquire_token_for_user(username=self.username, password=self.password):
+                _AUTH_CONTEXTS.pop(key, None)
+                return None
+            
+            _AUTH_CONTEXTS[key] = (auth_ctx, time.monotonic())
+            return auth_ctx
+    
+    def _online_session(self):
+        """Return the pooled session for SharePoint Online; office365 authenticates each request itself"""
+        return _get_session((self.site_url, self.username, 'online'), None)
+    
+    def close(self):
+        """Close the pooled SharePoint sessions shared by all clients"""
+        _close_sessions()
+    
+    def _reset_auth(self):
+        """Drop this client's bindings and cached credentials so the next call authenticates again"""
+        with _AUTH_LOCK:
+            _AUTH_CONTEXTS.pop((self.site_url, self.username), None)
+            for kind in ('ntlm', 'basic', 'online'):
+                session = _SESSIONS.pop((self.site_url, self.username, kind), None)
+                if session is not None:
+                    session.close()
+        
+        self.ctx = None
+        self.list_obj = None
+        self.site = None
+        self.sp_list = None
+    
     def get_list(self):
         """Get SharePoint list object"""
         if not self.site and not self.ctx:
@@ -119,19 +364,55 @@ class SharePointClient:
             try:
                 web = self.ctx.web
                 self.list_obj = web.lists.get_by_title(self.list_name)
-                self.ctx.load(self.list_obj)
+                # Item writes are typed with ListItemEntityTypeFullName; loading it
+                # here keeps add_item and update() from queueing a GET for it
+                self.ctx.load(self.list_obj, ['ItemCount', 'Id', 'Title', 'ListItemEntityTypeFullName'])
                 self.ctx.execute_query()
                 return self.list_obj
             except Exception as e:
+                if _is_unauthorized(e):
+                    raise
                 logger.error(f"Error getting online list: {str(e)}")
                 return None
     
+    @_with_reauth([])
     def get_list_fields(self):
-        """Get list field definitions"""
+        """Get list field definitions, cached per list for FIELDS_CACHE_TTL seconds"""
+        return self._get_cached_fields()[0]
+    
+    @_with_reauth({})
+    def get_field_types(self):
+        """Get a {field name: field type} map for the list, cached with the fields"""
+        return self._get_cached_fields()[1]
+    
+    def _get_cached_fields(self):
+        """Return (fields, types by name), fetching from SharePoint when stale"""
+        key = (self.site_url, self.list_name)
+        with _FIELDS_LOCK:
+            cached = _FIELDS_CACHE.get(key)
+        if cached and time.monotonic() - cached[0] < FIELDS_CACHE_TTL:
+            return cached[1], cached[2]
+        
         if self.is_onprem:
-            return self._get_onprem_fields()
+            fields = self._get_onprem_fields()
         else:
-            return self._get_online_fields()
+            fields = self._get_online_fields()
+        
+        # Failed lookups fall back to the defaults without being cached
+        if fields is None:
+            fields = self._get_default_fields() if self.is_onprem else []
+            return fields, {f['name']: f['type'] for f in fields}
+        
+        field_types = {f['name']: f['type'] for f in fields}
+        if fields:
+            with _FIELDS_LOCK:
+                _FIELDS_CACHE[key] = (time.monotonic(), fields, field_types)
+        return fields, field_types
+    
+    def invalidate_fields_cache(self):
+        """Drop the cached field definitions for this list"""
+        with _FIELDS_LOCK:
+            _FIELDS_CACHE.pop((self.site_url, self.list_name), None)
     
     def _get_onprem_fields(self):
         """Get field definitions for on-premise SharePoint using Shareplum"""
@@ -142,7 +423,7 @@ class SharePointClient:
         try:
             # For Shareplum, we need to get a sample item to understand the fields
             # or use the site's field definitions
-            sample_items = self.sp_list.get_list_items(fields=['Title'], rows=1)
+            sample_items = self.sp_list.get_list_items(fields=['Title'], row_limit=1)
             
             if sample_items:
                 # Get field names from the first item
@@ -188,8 +469,10 @@ class SharePointClient:
                 return self._get_default_fields()
             
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error getting on-premise fields: {str(e)}")
-            return self._get_default_fields()
+            return None
     
     def _get_default_fields(self):
         """Return default SharePoint fields"""
@@ -210,29 +493,17 @@ class SharePointClient:
         value_str = str(value)
         
         # Check for datetime patterns
-        datetime_patterns = [
-            r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}',
-            r'\d{1,2}/\d{1,2}/\d{4}',
-            r'\d{4}-\d{2}-\d{2}'
-        ]
-        
-        import re
-        for pattern in datetime_patterns:
-            if re.search(pattern, value_str):
-                return 'DateTime'
+        if _DATETIME_RE.search(value_str):
+            return 'DateTime'
         
-        # Check for numbers
-        try:
-            float(value_str)
-            if '.' in value_str:
-                return 'Number'
-            else:
-                return 'Integer'
-        except ValueError:
-            pass
+        # Check for numbers; most text values fail on the first character
+        if value_str[:1] in '-0123456789':
+            match = _NUM_RE.match(value_str)
+            if match:
+                return 'Number' if match.group(1) or match.group(2) else 'Integer'
         
         # Check for boolean
-        if value_str.lower() in ['true', 'false', '1', '0']:
+        if value_str.lower() in _BOOL_SET:
             return 'Boolean'
         
         # Default to text
@@ -261,17 +532,92 @@ class SharePointClient:
             
             return field_info
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error getting online fields: {str(e)}")
-            return []
+            return None
     
-    def get_list_items(self, page=1, page_size=100, filters=None, sort_field=None, sort_order='asc'):
-        """Get list items with pagination, filtering, and sorting"""
+    @_with_reauth({'items': [], 'total': 0, 'fields': []})
+    def get_list_items(self, page=1, page_size=100, filters=None, sort_field=None, sort_order='asc',
+                       select_fields=None):
+        """Get list items with pagination, filtering, and sorting
+        
+        select_fields limits the columns fetched from SharePoint; None fetches every column.
+        """
+        cache_key = (self.site_url, self.list_name, page, page_size,
+                     json.dumps(filters, sort_keys=True, default=str), sort_field, sort_order,
+                     tuple(select_fields) if select_fields else None)
+        with _ITEMS_LOCK:
+            cached = _ITEMS_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+        
         if self.is_onprem:
-            return self._get_onprem_items(page, page_size, filters, sort_field, sort_order)
+            data = self._get_onprem_items(page, page_size, filters, sort_field, sort_order, select_fields)
         else:
-            return self._get_online_items(page, page_size, filters, sort_field, sort_order)
+            data = self._get_online_items(page, page_size, filters, sort_field, sort_order, select_fields)
+        
+        # Failed fetches return without a 'page' key and are not cached
+        if 'page' in data:
+            with _ITEMS_LOCK:
+                _ITEMS_CACHE[cache_key] = data
+        return data
+    
+    def invalidate_items_cache(self):
+        """Drop every cached page of this list's items"""
+        prefix = (self.site_url, self.list_name)
+        with _ITEMS_LOCK:
+            for key in [key for key in _ITEMS_CACHE if key[:2] == prefix]:
+                _ITEMS_CACHE.pop(key, None)
+            _ITEM_COUNTS.pop(prefix, None)
+            for key in [key for key in _PAGE_CURSORS if key[:2] == prefix]:
+                _PAGE_CURSORS.pop(key, None)
     
-    def _get_onprem_items(self, page=1, page_size=100, filters=None, sort_field=None, sort_order='asc'):
+    def get_item_count(self):
+        """Get the number of items in the list, or None when SharePoint does not report it"""
+        if not self.is_onprem:
+            # Loaded along with the list by get_list, so it is never stale
+            return self.list_obj.properties.get('ItemCount') if self.list_obj is not None else None
+        
+        key = (self.site_url, self.list_name)
+        with _ITEMS_LOCK:
+            cached = _ITEM_COUNTS.get(key, _UNKNOWN_COUNT)
+        if cached is not _UNKNOWN_COUNT:
+            return cached
+        
+        # Cached as long as the pages it is reported with, or until this process
+        # writes to the list; a list that reports no count is not asked again sooner
+        count = None
+        try:
+            count = int(self._get_onprem_list_info()['ItemCount'])
+        except Exception as e:
+            if _is_unauthorized(e):
+                raise
+            logger.error(f"Error getting on-premise item count: {str(e)}")
+        
+        with _ITEMS_LOCK:
+            _ITEM_COUNTS[key] = count
+        return count
+    
+    def _get_onprem_list_info(self):
+        """Return the attributes of the list's GetList <List> element (ItemCount, Title, ...)"""
+        # Shareplum's own get_list keeps only the field schema of this response
+        sp_list = self.sp_list
+        soap_request = Soap('GetList')
+        soap_request.add_parameter('listName', sp_list.list_name)
+        response = post(sp_list._session,
+                        url=sp_list._url('Lists'),
+                        headers=sp_list._headers('GetList'),
+                        data=str(soap_request).encode('utf-8'),
+                        verify=sp_list._verify_ssl,
+                        timeout=sp_list.timeout)
+        
+        envelope = etree.fromstring(response.text.encode('utf-8'),
+                                    parser=etree.XMLParser(huge_tree=sp_list.huge_tree, recover=True))
+        return dict(envelope[0][0][0][0].items())
+    
+    def _get_onprem_items(self, page=1, page_size=100, filters=None, sort_field=None, sort_order='asc',
+                          select_fields=None):
         """Get items from on-premise SharePoint using Shareplum"""
         if not self.sp_list:
             if not self.authenticate():
@@ -282,139 +628,259 @@ class SharePointClient:
             # Shareplum supports rows parameter for limiting results
             max_rows = page * page_size
             
-            # Get items using Shareplum
-            # You can specify fields to retrieve and number of rows
-            items = self.sp_list.get_list_items(rows=max_rows)
+            df = self._get_onprem_frame(max_rows, filters, sort_field, sort_order, select_fields)
             
-            # Get field definitions
-            fields = self.get_list_fields()
-            
-            # Process items
-            processed_items = []
-            for item in items:
-                item_data = {}
-                
-                # Process all fields found in the item
-                for key, value in item.items():
-                    # Find field definition for proper type handling
-                    field_def = next((f for f in fields if f['name'] == key), None)
-                    field_type = field_def['type'] if field_def else 'Text'
-                    
-                    # Handle different field types
-                    if field_type in ['DateTime', 'Date'] and value:
-                        try:
-                            if isinstance(value, str):
-                                # Try to parse various date formats
-                                date_formats = [
-                                    '%Y-%m-%dT%H:%M:%SZ',
-                                    '%Y-%m-%dT%H:%M:%S.%fZ',
-                                    '%Y-%m-%d %H:%M:%S',
-                                    '%m/%d/%Y %H:%M:%S',
-                                    '%m/%d/%Y',
-                                    '%Y-%m-%d'
-                                ]
-                                
-                                for fmt in date_formats:
-                                    try:
-                                        dt = datetime.strptime(value, fmt)
-                                        item_data[key] = dt.strftime('%Y-%m-%d %H:%M:%S')
-                                        break
-                                    except ValueError:
-                                        continue
-                                else:
-                                    item_data[key] = value
-                            else:
-                                item_data[key] = str(value)
-                        except:
-                            item_data[key] = value
-                    elif field_type in ['User', 'Lookup'] and value:
-                        # Handle user and lookup fields
-                        if isinstance(value, dict):
-                            item_data[key] = value.get('Title', str(value))
-                        elif isinstance(value, str) and ';#' in value:
-                            # SharePoint lookup format: "ID;#Value"
-                            parts = value.split(';#')
-                            item_data[key] = parts[1] if len(parts) > 1 else parts[0]
-                        else:
-                            item_data[key] = str(value) if value is not None else ''
-                    else:
-                        item_data[key] = value
-                
-                processed_items.append(item_data)
-            
-            # Apply client-side filtering
-            if filters:
-                processed_items = self._apply_filters(processed_items, filters)
-            
-            # Apply client-side sorting
-            if sort_field and sort_field in (processed_items[0].keys() if processed_items else []):
-                reverse = sort_order.lower() == 'desc'
-                try:
-                    processed_items.sort(key=lambda x: x.get(sort_field, ''), reverse=reverse)
-                except TypeError:
-                    # Handle mixed types by converting to string
-                    processed_items.sort(key=lambda x: str(x.get(sort_field, '')), reverse=reverse)
+            # Filtered results have no cheap count, so they report the matches fetched so far
+            total_items = None if filters else self.get_item_count()
+            if total_items is None:
+                total_items = len(df)
             
             # Apply pagination
-            total_items = len(processed_items)
             start_idx = (page - 1) * page_size
             end_idx = start_idx + page_size
-            paginated_items = processed_items[start_idx:end_idx]
+            paginated_items = df.iloc[start_idx:end_idx].to_dict('records')
             
             return {
                 'items': paginated_items,
                 'total': total_items,
-                'fields': fields,
+                'fields': self.get_list_fields(),
                 'page': page,
                 'page_size': page_size
             }
             
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error getting on-premise items: {str(e)}")
             return {'items': [], 'total': 0, 'fields': []}
     
-    def _get_online_items(self, page=1, page_size=100, filters=None, sort_field=None, sort_order='asc'):
-        """Get items from SharePoint Online"""
+    def _get_onprem_frame(self, max_rows, filters=None, sort_field=None, sort_order='asc', select_fields=None,
+                          after_id=None):
+        """Fetch up to max_rows on-premise items as a processed, filtered and sorted DataFrame
+        
+        after_id restricts the fetch to items with a greater ID, for paging in ID order.
+        """
+        field_types = self.get_field_types()
+        
+        # Let SharePoint filter and sort so the row limit applies to matching rows
+        pushed_filters, filters = self._split_filters(filters, field_types)
+        if sort_field not in field_types:
+            sort_field = None
+        query = self._build_shareplum_query(pushed_filters, sort_field, sort_order, after_id)
+        
+        items = self._get_onprem_list_items(
+            fields=self._view_fields(select_fields, filters),
+            query=query,
+            row_limit=max_rows
+        )
+        
+        # Keep values as the Python objects Shareplum returned; missing cells become None
+        df = pd.DataFrame(items, dtype=object)
+        df = df.where(df.notna(), None)
+        
+        # Process whole columns by field type instead of cell by cell
+        df = self._format_frame(df, field_types)
+        
+        # Apply client-side filtering for fields SharePoint cannot match with <Contains>
+        if filters:
+            df = self._apply_filters(df, filters)
+        
+        return df
+    
+    def _get_onprem_list_items(self, fields=None, query=None, row_limit=0):
+        """Get on-premise items like Shareplum's get_list_items, but honouring the query's OrderBy
+        
+        get_list_items only sends the Where part of query, so every page came back
+        in ID order. Display names are mapped to internal names the same way.
+        """
+        sp_list = self.sp_list
+        soap_request = Soap('GetListItems')
+        soap_request.add_parameter('listName', sp_list.list_name)
+        
+        if fields:
+            view_fields = [sp_list._disp_cols[name]['name'] for name in fields]
+            soap_request.add_view_fields(view_fields)
+        else:
+            view_fields = list(sp_list._sp_cols)
+        
+        query = query or {}
+        order_by = []
+        for field in query.get('OrderBy') or ['ID']:
+            if isinstance(field, tuple):
+                order_by.append((sp_list._disp_cols[field[0]]['name'], field[1]))
+            else:
+                order_by.append(sp_list._disp_cols[field]['name'])
+        caml_query = {'OrderBy': order_by}
+        if 'Where' in query:
+            caml_query['Where'] = self._build_onprem_where(query['Where'])
+        soap_request.add_query(caml_query)
+        soap_request.add_parameter('rowLimit', str(row_limit))
+        
+        response = post(sp_list._session,
+                        url=sp_list._url('Lists'),
+                        headers=sp_list._headers('GetListItems'),
+                        data=str(soap_request).encode('utf-8'),
+                        verify=sp_list._verify_ssl,
+                        timeout=sp_list.timeout)
+        
+        envelope = etree.fromstring(response.text.encode('utf-8'),
+                                    parser=etree.XMLParser(huge_tree=sp_list.huge_tree, recover=True))
+        # Attributes are the internal column names prefixed with 'ows_'
+        data = [
+            {key[4:]: value for key, value in row.items() if key[4:] in view_fields}
+            for row in envelope[0][0][0][0][0]
+        ]
+        sp_list._convert_to_display(data)
+        return data
+    
+    def _build_onprem_where(self, clauses):
+        """Build the CAML <Where> element for a Shareplum-style Where list"""
+        sp_list = self.sp_list
+        where = etree.Element('Where')
+        parents = [where]
+        for clause in clauses:
+            if clause == 'And':
+                parents.append(etree.SubElement(parents[-1], 'And'))
+            elif clause == 'Or':
+                if parents[-1].tag == 'Or':
+                    parents.pop()
+                parents.append(etree.SubElement(parents[-1], 'Or'))
+            else:
+                operator, field_name, value = clause
+                column = sp_list._disp_cols[field_name]
+                comparison = etree.SubElement(parents[-1], operator)
+                etree.SubElement(comparison, 'FieldRef').set('Name', column['name'])
+                value_el = etree.SubElement(comparison, 'Value')
+                value_el.set('Type', column['type'])
+                value_el.text = str(sp_list._sp_type(field_name, value))
+        return where
+    
+    def _format_frame(self, df, field_types):
+        """Convert the DateTime and User/Lookup columns of a frame of raw items to display values"""
+        for column in df.columns:
+            field_type = field_types.get(column, 'Text')
+            if field_type in ('DateTime', 'Date'):
+                df[column] = self._format_datetime_column(df[column], column)
+            elif field_type in ('User', 'Lookup'):
+                df[column] = self._format_lookup_column(df[column])
+        return df
+    
+    def _format_datetime_column(self, column, column_name):
+        """Normalize a DateTime column to '%Y-%m-%d %H:%M:%S', keeping unparseable values as-is"""
+        column = column.copy()
+        is_str = column.map(type).eq(str)
+        strings = is_str & column.ne('')
+        others = ~is_str & column.notna() & column.astype(bool)
+        
+        parsed = self._parse_datetime_strings(column[strings], column_name)
+        parsed = parsed[parsed.notna()]
+        column[parsed.index] = parsed.dt.strftime('%Y-%m-%d %H:%M:%S')
+        column[others] = column[others].astype(str)
+        return column
+    
+    def _parse_datetime_strings(self, values, column_name):
+        """Parse a Series of date strings with the column's known format, falling back to inference"""
+        # utc=True lets 'Z' suffixed and naive values share one column without shifting either
+        if values.empty:
+            return pd.to_datetime(values, errors='coerce', utc=True)
+        
+        key = (self.site_url, self.list_name, column_name)
+        fmt = _DATETIME_FORMAT_CACHE.get(key) or self._detect_datetime_format(values.iloc[0])
+        if fmt is None:
+            return pd.to_datetime(values, errors='coerce', utc=True, format='mixed')
+        
+        _DATETIME_FORMAT_CACHE[key] = fmt
+        parsed = pd.to_datetime(values, errors='coerce', utc=True, format=fmt)
+        
+        # Only values in some other format pay for per-value format inference
+        misses = parsed.isna()
+        if misses.any():
+            parsed[misses] = pd.to_datetime(values[misses], errors='coerce', utc=True, format='mixed')
+        return parsed
+    
+    def _detect_datetime_format(self, value):
+        """Return the first of DATETIME_FORMATS that parses value, or None"""
+        for fmt in DATETIME_FORMATS:
+            try:
+                datetime.strptime(value, fmt)
+                return fmt
+            except ValueError:
+                continue
+        return None
+    
+    def _format_lookup_column(self, column):
+        """Reduce a User/Lookup column to display values ("ID;#Value" -> "Value")"""
+        column = column.copy()
+        present = column.notna() & column.astype(bool)
+        column[present] = column[present].map(_lookup_tail)
+        return column
+    
+    def _get_online_items(self, page=1, page_size=100, filters=None, sort_field=None, sort_order='asc',
+                          select_fields=None, paging_info=None):
+        """Get items from SharePoint Online
+        
+        Pages after the first start from the paging cursor saved when the previous page was read,
+        or from paging_info when the caller tracks positions itself.
+        """
         if not self.get_list():
             return {'items': [], 'total': 0, 'fields': []}
         
         try:
+            # Get field definitions
+            fields = self.get_list_fields()
+            field_types = self.get_field_types()
+            
             # Build CAML query
-            query = self._build_caml_query(filters, sort_field, sort_order, page, page_size)
+            pushed_filters, filters = self._split_filters(filters, field_types)
+            if sort_field != 'ID' and sort_field not in field_types:
+                sort_field = None
+            view_fields = self._view_fields(select_fields, filters)
+            # The paging token for the next page needs the last row's sort value
+            if view_fields is not None and sort_field and sort_field != 'ID' and sort_field not in view_fields:
+                view_fields.append(sort_field)
+            
+            cursor_key = None
+            if paging_info is None:
+                cursor_key = (self.site_url, self.list_name,
+                              json.dumps([pushed_filters, sort_field, sort_order, page_size]))
+                if page > 1:
+                    paging_info = self._find_page_cursor(page, page_size, pushed_filters, sort_field, sort_order,
+                                                         cursor_key)
+                    if paging_info is None:
+                        # The list has no rows at this page
+                        total_items = None if (pushed_filters or filters) else self.get_item_count()
+                        return {'items': [], 'total': total_items or 0, 'fields': fields, 'page': page,
+                                'page_size': page_size}
+            
+            query = self._build_caml_query(pushed_filters, sort_field, sort_order, page, page_size, view_fields,
+                                           paging_info)
             
             items = self.list_obj.get_items(query)
             self.ctx.load(items)
             self.ctx.execute_query()
             
-            # Get field definitions
-            fields = self.get_list_fields()
+            # A full page means the next one starts right after its last row
+            items = list(items)
+            if cursor_key is not None and len(items) == page_size:
+                with _ITEMS_LOCK:
+                    _PAGE_CURSORS[cursor_key + (page + 1,)] = self._paging_token(items[-1].properties, sort_field)
             
-            # Process items
-            processed_items = []
-            for item in items:
-                item_data = {'ID': item.properties['Id']}
-                for field in fields:
-                    field_name = field['name']
-                    value = item.properties.get(field_name)
-                    
-                    # Handle different field types
-                    if field['type'] == 'DateTime' and value:
-                        try:
-                            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                            item_data[field_name] = dt.strftime('%Y-%m-%d %H:%M:%S')
-                        except:
-                            item_data[field_name] = value
-                    elif field['type'] == 'User' and value:
-                        item_data[field_name] = value.get('Title', '') if isinstance(value, dict) else str(value)
-                    elif field['type'] == 'Lookup' and value:
-                        item_data[field_name] = value.get('Title', '') if isinstance(value, dict) else str(value)
-                    else:
-                        item_data[field_name] = value
-                
-                processed_items.append(item_data)
+            # Process whole columns by field type instead of cell by cell
+            field_names = [f['name'] for f in fields
+                           if f['name'] != 'ID' and (view_fields is None or f['name'] in view_fields)]
+            df = pd.DataFrame([item.properties for item in items], columns=['Id'] + field_names, dtype=object)
+            df = df.where(df.notna(), None).rename(columns={'Id': 'ID'})
+            df = self._format_frame(df, field_types)
+            
+            # Apply client-side filtering for fields SharePoint cannot match with <Contains>
+            if filters:
+                df = self._apply_filters(df, filters)
+            processed_items = df.to_dict('records')
             
-            # Get total count (simplified approach)
-            total_items = len(processed_items)
+            # Filtered results have no cheap count, so they report the rows up to this page
+            total_items = None if (pushed_filters or filters) else self.get_item_count()
+            if total_items is None:
+                total_items = (page - 1) * page_size + len(processed_items)
             
             return {
                 'items': processed_items,
@@ -425,33 +891,90 @@ class SharePointClient:
             }
             
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error getting online items: {str(e)}")
             return {'items': [], 'total': 0, 'fields': []}
     
-    def _apply_filters(self, items, filters):
-        """Apply client-side filters to items"""
+    def _find_page_cursor(self, page, page_size, filters, sort_field, sort_order, cursor_key):
+        """Find the paging info where page starts, or None past the end of the list"""
+        with _ITEMS_LOCK:
+            # Start from the nearest page whose position is already known
+            known = page
+            while known > 1 and cursor_key + (known,) not in _PAGE_CURSORS:
+                known -= 1
+            paging_info = _PAGE_CURSORS.get(cursor_key + (known,)) if known > 1 else None
+        if known == page:
+            return paging_info
+        
+        # Walk the remaining rows with only the columns the token needs, in
+        # page-aligned hops small enough to stay under the list view threshold
+        hop = max(page_size, LIST_VIEW_THRESHOLD // page_size * page_size)
+        view_fields = ['ID', sort_field] if sort_field and sort_field != 'ID' else ['ID']
+        seen = (known - 1) * page_size
+        skip = (page - 1) * page_size
+        
+        while seen < skip:
+            row_limit = min(hop, skip - seen)
+            query = self._build_caml_query(filters, sort_field, sort_order, page_size=row_limit,
+                                           view_fields=view_fields, paging_info=paging_info)
+            items = self.list_obj.get_items(query)
+            self.ctx.load(items)
+            self.ctx.execute_query()
+            
+            items = list(items)
+            if len(items) < row_limit:
+                return None
+            
+            seen += row_limit
+            paging_info = self._paging_token(items[-1].properties, sort_field)
+            with _ITEMS_LOCK:
+                _PAGE_CURSORS[cursor_key + (seen // page_size + 1,)] = paging_info
+        
+        return paging_info
+    
+    def _paging_token(self, properties, sort_field=None):
+        """Build the ListItemCollectionPosition paging info that follows an item"""
+        token = 'Paged=TRUE'
+        if sort_field and sort_field != 'ID':
+            token += f"&p_{sort_field}={quote(str(properties.get(sort_field) or ''))}"
+        return token + f"&p_ID={properties['Id']}"
+    
+    def _apply_filters(self, df, filters):
+        """Apply client-side filters to a DataFrame of items"""
         if not filters:
-            return items
-        
-        filtered_items = []
-        for item in items:
-            match = True
-            for field_name, filter_value in filters.items():
-                item_value = str(item.get(field_name, '')).lower()
-                if str(filter_value).lower() not in item_value:
-                    match = False
-                    break
-            if match:
-                filtered_items.append(item)
+            return df
         
-        return filtered_items
+        # Casefold each needle once rather than once per row
+        needles = [(field_name, str(filter_value).casefold()) for field_name, filter_value in filters.items()]
+        
+        for field_name, needle in needles:
+            # An empty needle matches every row, including ones missing the field
+            if not needle:
+                continue
+            if field_name not in df.columns:
+                return df.iloc[0:0]
+            
+            # Each filter only scans the rows that survived the previous ones; missing
+            # cells are blank, not the text 'None'
+            haystack = df[field_name].fillna('').astype(str).str.casefold()
+            df = df[haystack.str.contains(needle, regex=False)]
+            if df.empty:
+                break
+        
+        return df
     
+    @_with_reauth(None)
     def create_item(self, item_data):
         """Create a new list item"""
         if self.is_onprem:
-            return self._create_onprem_item(item_data)
+            item_id = self._create_onprem_item(item_data)
         else:
-            return self._create_online_item(item_data)
+            item_id = self._create_online_item(item_data)
+        
+        if item_id is not None:
+            self.invalidate_items_cache()
+        return item_id
     
     def _create_onprem_item(self, item_data):
         """Create item in on-premise SharePoint using Shareplum"""
@@ -465,7 +988,10 @@ class SharePointClient:
                 return result[0].get('ID')
             return None
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error creating on-premise item: {str(e)}")
+            self.invalidate_fields_cache()
             return None
     
     def _create_online_item(self, item_data):
@@ -478,15 +1004,23 @@ class SharePointClient:
             self.ctx.execute_query()
             return item_create_info.properties['Id']
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error creating online item: {str(e)}")
+            self.invalidate_fields_cache()
             return None
     
+    @_with_reauth(False)
     def update_item(self, item_id, item_data):
         """Update an existing list item"""
         if self.is_onprem:
-            return self._update_onprem_item(item_id, item_data)
+            success = self._update_onprem_item(item_id, item_data)
         else:
-            return self._update_online_item(item_id, item_data)
+            success = self._update_online_item(item_id, item_data)
+        
+        if success:
+            self.invalidate_items_cache()
+        return success
     
     def _update_onprem_item(self, item_id, item_data):
         """Update item in on-premise SharePoint using Shareplum"""
@@ -502,7 +1036,10 @@ class SharePointClient:
             result = self.sp_list.update_list_items(data=[update_data], kind='Update')
             return result is not None
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error updating on-premise item: {str(e)}")
+            self.invalidate_fields_cache()
             return False
     
     def _update_online_item(self, item_id, item_data):
@@ -511,20 +1048,27 @@ class SharePointClient:
             return False
         
         try:
-            item = self.list_obj.get_item_by_id(item_id)
-            item.update(item_data)
+            self._bind_item(item_id, item_data).update()
             self.ctx.execute_query()
             return True
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error updating online item: {str(e)}")
+            self.invalidate_fields_cache()
             return False
     
+    @_with_reauth(False)
     def delete_item(self, item_id):
         """Delete a list item"""
         if self.is_onprem:
-            return self._delete_onprem_item(item_id)
+            success = self._delete_onprem_item(item_id)
         else:
-            return self._delete_online_item(item_id)
+            success = self._delete_online_item(item_id)
+        
+        if success:
+            self.invalidate_items_cache()
+        return success
     
     def _delete_onprem_item(self, item_id):
         """Delete item from on-premise SharePoint using Shareplum"""
@@ -536,6 +1080,8 @@ class SharePointClient:
             result = self.sp_list.update_list_items(data=[{'ID': item_id}], kind='Delete')
             return result is not None
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error deleting on-premise item: {str(e)}")
             return False
     
@@ -550,46 +1096,328 @@ class SharePointClient:
             self.ctx.execute_query()
             return True
         except Exception as e:
+            if _is_unauthorized(e):
+                raise
             logger.error(f"Error deleting online item: {str(e)}")
             return False
     
+    @_with_reauth({'success': False, 'errors': []})
     def bulk_update(self, updates):
-        """Perform bulk updates"""
+        """Perform bulk updates with one batched request per kind of operation"""
+        if self.is_onprem:
+            results = self._bulk_update_onprem(updates)
+        else:
+            results = self._bulk_update_online(updates)
+        
+        # Even a partly failed batch may have changed rows
+        if updates:
+            self.invalidate_items_cache()
+        return results
+    
+    async def async_bulk_update(self, updates, batch_size=50, concurrency=16):
+        """Perform bulk updates as concurrent batches of batch_size operations"""
+        if not updates:
+            return {'success': True, 'errors': []}
+        
+        # Authenticate once up front so the worker threads only reuse the connection
+        authenticated = self.sp_list if self.is_onprem else self.ctx
+        if not authenticated and not self.authenticate():
+            return {'success': False, 'errors': []}
+        
+        chunks = [updates[i:i + batch_size] for i in range(0, len(updates), batch_size)]
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            async def _send(chunk):
+                async with semaphore:
+                    return await loop.run_in_executor(executor, self._bulk_update_chunk, chunk)
+            
+            chunk_results = await asyncio.gather(*[_send(chunk) for chunk in chunks])
+        
+        errors = [error for result in chunk_results for error in result['errors']]
+        return {'success': not errors, 'errors': errors}
+    
+    def _bulk_update_chunk(self, updates):
+        """Run one batch from async_bulk_update on a worker thread"""
+        # Each batch runs on its own copy of this client, so a re-authentication
+        # in one thread cannot swap site/list bindings out from under another
+        client = copy.copy(self)
+        if not self.is_onprem:
+            # ClientContext query queues are not thread-safe, so online copies
+            # share only the cached auth context
+            client.ctx = None
+            client.list_obj = None
+        return client.bulk_update(updates)
+    
+    def _bulk_update_onprem(self, updates):
+        """Send bulk updates to on-premise SharePoint as one CAML Batch per kind"""
+        if not self.sp_list:
+            if not self.authenticate():
+                return {'success': False, 'errors': []}
+        
+        results = {'success': True, 'errors': []}
+        groups = {'New': [], 'Update': [], 'Delete': []}
+        
+        for update in updates:
+            if update['action'] == 'create':
+                groups['New'].append((update, dict(update['data'])))
+            elif update['action'] == 'update':
+                groups['Update'].append((update, dict(update['data'], ID=update['id'])))
+            elif update['action'] == 'delete':
+                groups['Delete'].append((update, {'ID': update['id']}))
+            else:
+                results['errors'].append(self._bulk_error(update, f"Unsupported action: {update['action']}"))
+        
+        sent = False
+        for kind, group in groups.items():
+            if not group:
+                continue
+            
+            try:
+                result = self.sp_list.update_list_items(data=[row for _, row in group], kind=kind)
+                sent = True
+                results['errors'].extend(self._batch_errors(result, group))
+            except Exception as e:
+                # Retrying after an earlier batch went through would apply it twice
+                if _is_unauthorized(e) and not sent:
+                    raise
+                logger.error(f"Error executing on-premise {kind} batch: {str(e)}")
+                results['errors'].extend(self._bulk_error(update, e) for update, _ in group)
+        
+        results['success'] = not results['errors']
+        return results
+    
+    def _batch_errors(self, result, group):
+        """Collect per-row errors from the <Result ID="n,Kind"> map Shareplum returns"""
+        errors = []
+        if not isinstance(result, dict):
+            return errors
+        
+        for result_id, outcome in result.items():
+            # Failed rows carry an (error code, error text) pair instead of a plain code
+            if not isinstance(outcome, tuple):
+                continue
+            
+            index = int(str(result_id).split(',')[0]) - 1
+            update = group[index][0] if 0 <= index < len(group) else {}
+            errors.append(self._bulk_error(update, outcome[1] or outcome[0]))
+        
+        return errors
+    
+    def _bulk_update_online(self, updates):
+        """Send bulk updates to SharePoint Online as a single $batch request"""
+        if not self.get_list():
+            return {'success': False, 'errors': []}
+        
         results = {'success': True, 'errors': []}
+        queued = []
         
+        # Queue every operation on the context without executing it
         for update in updates:
             try:
                 if update['action'] == 'create':
-                    self.create_item(update['data'])
+                    self.list_obj.add_item(update['data'])
                 elif update['action'] == 'update':
-                    self.update_item(update['id'], update['data'])
+                    self._bind_item(update['id'], update['data']).update()
                 elif update['action'] == 'delete':
-                    self.delete_item(update['id'])
+                    self._bind_item(update['id']).delete_object()
+                else:
+                    raise ValueError(f"Unsupported action: {update['action']}")
+                queued.append(update)
+            except Exception as e:
+                results['errors'].append(self._bulk_error(update, e))
+        
+        if queued:
+            try:
+                self._execute_batch()
             except Exception as e:
-                results['errors'].append({
-                    'id': update.get('id'),
-                    'action': update['action'],
-                    'error': str(e)
-                })
-                results['success'] = False
+                # A rejected $batch applied nothing, so it is safe to retry
+                if _is_unauthorized(e):
+                    raise
+                # The batch response does not say which operation failed
+                logger.error(f"Error executing online batch: {str(e)}")
+                results['errors'].extend(self._bulk_error(update, e) for update in queued)
         
+        results['success'] = not results['errors']
         return results
     
+    def _execute_batch(self, items_per_batch=100):
+        """Send the pending queries as $batch requests over the pooled Online session
+        
+        Mirrors ClientContext.execute_batch, whose own batch request would go
+        out through module-level requests calls on a fresh connection.
+        """
+        batch_request = ODataBatchV3Request(JsonLightFormat())
+        batch_request.beforeExecute += self.ctx._authenticate_request
+        batch_request.beforeExecute += self.ctx._ensure_form_digest
+        _use_session(batch_request, self._online_session())
+        while self.ctx.has_pending_request:
+            batch_request.execute_query(self.ctx._get_next_query(items_per_batch))
+    
+    def _bind_item(self, item_id, item_data=None):
+        """Bind an Online list item by ID without loading it, staging any changed values"""
+        # ListItem.update() takes no values; they have to be set as properties first
+        item = self.list_obj.get_item_by_id(item_id)
+        if item_data is not None:
+            # Without the type update() queues a GET of the item's ParentList,
+            # which in a $batch runs after the MERGE and leaves it typed SP.ListItem
+            item._entity_type_name = self.list_obj.properties.get('ListItemEntityTypeFullName')
+        for name, value in (item_data or {}).items():
+            item.set_property(name, value)
+        return item
+    
+    def _bulk_error(self, update, error):
+        """Build the error entry reported for a failed bulk operation"""
+        return {
+            'id': update.get('id'),
+            'action': update.get('action'),
+            'error': str(error)
+        }
+    
     def export_to_dataframe(self):
-        """Export all list data to pandas DataFrame"""
-        data = self.get_list_items(page_size=current_app.config['MAX_EXPORT_ROWS'])
-        if data['items']:
-            return pd.DataFrame(data['items'])
-        return pd.DataFrame()
+        """Export all list data to pandas DataFrame, fetched EXPORT_PAGE_SIZE rows at a time"""
+        if self.is_onprem:
+            if not self.sp_list and not self.authenticate():
+                return pd.DataFrame()
+            pages = self._iter_onprem_export_pages
+        else:
+            pages = self._iter_online_export_pages
+        
+        # Only one page of raw items is alive at a time; the rest is held as columns
+        try:
+            frames = list(pages(current_app.config['MAX_EXPORT_ROWS']))
+        except Exception as e:
+            logger.error(f"Error exporting items: {str(e)}")
+            return pd.DataFrame()
+        
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True, copy=False)
+    
+    def _iter_onprem_export_pages(self, max_rows):
+        """Yield on-premise items as DataFrames in ID order, paging with an ID > last ID filter"""
+        last_id = None
+        remaining = max_rows
+        while remaining > 0:
+            size = min(EXPORT_PAGE_SIZE, remaining)
+            df = self._get_onprem_frame(size, sort_field='ID', after_id=last_id)
+            if df.empty:
+                break
+            
+            yield df
+            remaining -= len(df)
+            if len(df) < size:
+                break
+            # Shareplum returns IDs as strings; compare them as numbers, whatever the row order
+            last_id = int(df['ID'].astype(int).max())
+    
+    def _iter_online_export_pages(self, max_rows):
+        """Yield SharePoint Online items as DataFrames in ID order, paging with ListItemCollectionPosition"""
+        paging_info = None
+        remaining = max_rows
+        while remaining > 0:
+            size = min(EXPORT_PAGE_SIZE, remaining)
+            data = self._get_online_items(page_size=size, sort_field='ID', paging_info=paging_info)
+            # Failed fetches come back without a 'page' key; stopping there would
+            # return a truncated export as if it were complete
+            if 'page' not in data:
+                raise RuntimeError(f"Failed to fetch export page after {max_rows - remaining} rows")
+            
+            items = data['items']
+            if not items:
+                break
+            
+            yield pd.DataFrame(items)
+            remaining -= len(items)
+            if len(items) < size:
+                break
+            paging_info = f"Paged=TRUE&p_ID={items[-1]['ID']}"
     
-    def _build_caml_query(self, filters=None, sort_field=None, sort_order='asc', page=1, page_size=100):
+    def _split_filters(self, filters, field_types):
+        """Split filters into ({field: value} for SharePoint <Contains>, {field: value} left client-side)"""
+        pushed_filters, client_filters = {}, {}
+        for field_name, filter_value in (filters or {}).items():
+            if field_types.get(field_name) in CAML_CONTAINS_TYPES and filter_value not in (None, ''):
+                pushed_filters[field_name] = str(filter_value)
+            else:
+                client_filters[field_name] = filter_value
+        return pushed_filters, client_filters
+    
+    def _view_fields(self, select_fields, client_filters):
+        """Return the columns to fetch for select_fields, plus any filtered client-side; None for all"""
+        if not select_fields:
+            return None
+        
+        view_fields = list(dict.fromkeys(select_fields))
+        view_fields.extend(name for name in client_filters if name not in view_fields)
+        return view_fields
+    
+    def _build_caml_query(self, filters=None, sort_field=None, sort_order='asc', page=1, page_size=100,
+                          view_fields=None, paging_info=None):
         """Build CAML query for SharePoint Online"""
-        # Simplified CAML query - in production, build proper CAML XML
+        view = Element('View')
+        
+        if view_fields:
+            view_fields_el = SubElement(view, 'ViewFields')
+            for field_name in view_fields:
+                SubElement(view_fields_el, 'FieldRef', Name=field_name)
+        
+        query = SubElement(view, 'Query')
+        
+        clauses = []
+        for field_name, filter_value in (filters or {}).items():
+            contains = Element('Contains')
+            SubElement(contains, 'FieldRef', Name=field_name)
+            SubElement(contains, 'Value', Type='Text').text = filter_value
+            clauses.append(contains)
+        
+        if clauses:
+            # <And> takes exactly two children, so longer chains nest from the right
+            combined = clauses[-1]
+            for clause in reversed(clauses[:-1]):
+                parent = Element('And')
+                parent.append(clause)
+                parent.append(combined)
+                combined = parent
+            SubElement(query, 'Where').append(combined)
+        
+        if sort_field:
+            ascending = 'FALSE' if (sort_order or 'asc').lower() == 'desc' else 'TRUE'
+            SubElement(SubElement(query, 'OrderBy'), 'FieldRef', Name=sort_field, Ascending=ascending)
+        
+        if page_size:
+            row_limit = SubElement(view, 'RowLimit', Paged='TRUE')
+            row_limit.text = str(page_size)
+        
         query_options = {
-            'ViewXml': '<View><Query></Query></View>'
+            'ViewXml': tostring(view, encoding='unicode')
         }
         
-        if page_size:
-            query_options['ViewXml'] = f'<View><Query></Query><RowLimit>{page_size}</RowLimit></View>'
+        if paging_info:
+            query_options['ListItemCollectionPosition'] = {'PagingInfo': paging_info}
         
         return query_options
+    
+    def _build_shareplum_query(self, filters=None, sort_field=None, sort_order='asc', after_id=None):
+        """Build the Shareplum query dict equivalent of _build_caml_query's <Where>/<OrderBy>"""
+        query = {}
+        
+        clauses = [('Contains', field_name, filter_value) for field_name, filter_value in (filters or {}).items()]
+        if after_id is not None:
+            clauses.append(('Gt', 'ID', after_id))
+        
+        if clauses:
+            # Shareplum nests each 'And' marker around everything that follows it
+            where = []
+            for i, clause in enumerate(clauses):
+                if i < len(clauses) - 1:
+                    where.append('And')
+                where.append(clause)
+            query['Where'] = where
+        
+        if sort_field:
+            descending = (sort_order or 'asc').lower() == 'desc'
+            query['OrderBy'] = [(sort_field, 'DESCENDING') if descending else sort_field]
+        
+        return query